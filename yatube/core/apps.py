@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .checks import check_performance_settings
+
+        # gunicorn не запускает system checks, поэтому боевой профиль
+        # проверяется при старте каждого процесса.
+        if getattr(settings, 'PRODUCTION', False):
+            errors = check_performance_settings(None)
+            if errors:
+                raise ImproperlyConfigured('\n'.join(
+                    f'{error.id}: {error.msg}' for error in errors))
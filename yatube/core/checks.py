@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+DEBUG_PROCESSOR = 'django.template.context_processors.debug'
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+DEBUG_APPS = ('debug_toolbar',)
+
+
+def uses_cached_loader(template):
+    loaders = template.get('OPTIONS', {}).get('loaders') or []
+    return any(
+        isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+def template_errors(template):
+    errors = []
+    if not uses_cached_loader(template):
+        errors.append(Error(
+            'Шаблоны загружаются без cached.Loader.', id='core.E002'))
+    processors = template.get('OPTIONS', {}).get('context_processors', [])
+    if DEBUG_PROCESSOR in processors:
+        errors.append(Error(
+            'Подключён отладочный context processor.', id='core.E003'))
+    return errors
+
+
+@register(Tags.templates, Tags.caches, Tags.database)
+def check_performance_settings(app_configs, **kwargs):
+    """Настройки, которые замедляют боевой профиль."""
+    if not getattr(settings, 'PRODUCTION', False):
+        return []
+    errors = []
+    if settings.DEBUG:
+        errors.append(Error(
+            'DEBUG включён: Django хранит в памяти каждый SQL-запрос.',
+            id='core.E001'))
+    for template in settings.TEMPLATES:
+        if template['BACKEND'].endswith('DjangoTemplates'):
+            errors.extend(template_errors(template))
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        errors.append(Error(
+            'Кеш по умолчанию не общий для воркеров gunicorn.',
+            id='core.E004'))
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db':
+        errors.append(Error(
+            'Сессии читаются из базы на каждом запросе.',
+            hint='Используйте cached_db или cache.',
+            id='core.E005'))
+    if not settings.DATABASES['default'].get('CONN_MAX_AGE'):
+        errors.append(Error(
+            'CONN_MAX_AGE = 0: соединение с базой открывается на каждый '
+            'запрос.', id='core.E006'))
+    errors.extend(
+        Error(f'Отладочное приложение {app} в INSTALLED_APPS.',
+              id='core.E007')
+        for app in DEBUG_APPS if app in settings.INSTALLED_APPS
+    )
+    return errors
@@ -0,0 +1,14 @@
+"""Персональные фрагменты страниц.
+
+Страница рендерится одинаковой для всех пользователей и кешируется целиком,
+а всё, что зависит от request.user, выносится во фрагменты. В боевом профиле
+nginx подставляет их через SSI, в остальных они рендерятся на месте.
+"""
+
+FRAGMENTS = {
+    'user_nav': 'includes/user_nav.html',
+    'switcher': 'posts/includes/switcher.html',
+    'post_actions': 'posts/includes/post_actions.html',
+    'post_views': 'posts/includes/post_views.html',
+    'author_posts': 'posts/includes/author_posts.html',
+}
@@ -0,0 +1,133 @@
+"""Кеш объектов моделей по ключу: pk, slug, username.
+
+Объект читается из кеша, а при промахе — из базы и кладётся в кеш
+(read-through). Отсутствующий ключ тоже запоминается, ненадолго: бот,
+перебирающий несуществующие адреса, получает 404 без запроса к базе.
+Базу при промахе читает один процесс: он берёт блокировку cache.add,
+остальные ждут, пока значение появится в кеше. Сигналы post_save и
+post_delete модели сбрасывают все ключи объекта.
+
+Связанные объекты (автор и группа поста) хранятся в собственных кешах
+и подставляются при чтении, поэтому правка пользователя не оставляет
+его старую копию внутри закешированных постов.
+"""
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+# Запоминаемое значение для ключа, которого нет в базе.
+MISSING = 'objectcache:missing'
+# Сколько ждать, пока конкурент прочитает объект, прежде чем идти в базу.
+LOCK_TIMEOUT = 5
+WAIT_STEP = 0.05
+WAIT_STEPS = 20
+
+
+class ObjectCache:
+    def __init__(self, queryset, fields=('pk',), related=None, timeout=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.fields = fields
+        self.related = related or {}
+        self.timeout = timeout
+        self.prefix = f'obj:{self.model._meta.label_lower}'
+        post_save.connect(self.invalidate, sender=self.model, weak=False)
+        post_delete.connect(self.invalidate, sender=self.model, weak=False)
+
+    def key(self, field, value):
+        # Значения приходят из адреса: хеш делает ключ пригодным для
+        # memcached при любых символах и любой длине.
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'{self.prefix}:{field}:{digest}'
+
+    def get(self, **lookup):
+        """Объект по одному полю из fields или DoesNotExist."""
+        (field, value), = lookup.items()
+        key = self.key(field, value)
+        instance = cache.get(key)
+        # После смены slug или username старый ключ может ещё хранить
+        # объект с новым значением поля: такой ответ не годится.
+        if instance is None or instance != MISSING and (
+                str(getattr(instance, field)) != str(value)):
+            instance = self.load(key, field, value)
+        if instance == MISSING:
+            raise self.model.DoesNotExist(
+                f'{self.model.__name__} с {field}={value!r} не найден')
+        self.attach(instance)
+        return instance
+
+    def get_or_404(self, **lookup):
+        try:
+            return self.get(**lookup)
+        except self.model.DoesNotExist:
+            raise Http404(f'{self.model._meta.verbose_name} не найден')
+
+    def load(self, key, field, value):
+        lock = f'{key}:lock'
+        locked = cache.add(lock, 1, LOCK_TIMEOUT)
+        if not locked:
+            for _ in range(WAIT_STEPS):
+                time.sleep(WAIT_STEP)
+                instance = cache.get(key)
+                if instance is not None:
+                    return instance
+        try:
+            instance = self.queryset.select_related(*self.related).filter(
+                **{field: value}).first()
+            if instance is None:
+                cache.set(key, MISSING, settings.OBJECT_CACHE_MISS_TIMEOUT)
+                return MISSING
+            for name, related_cache in self.related.items():
+                related = getattr(instance, name)
+                if related is not None:
+                    related_cache.store(related)
+            self.store(instance)
+        finally:
+            # Не дождавшийся конкурента процесс блокировку не брал и
+            # снимать её не должен.
+            if locked:
+                cache.delete(lock)
+        return instance
+
+    def store(self, instance):
+        """Кладёт объект в кеш под всеми его ключами, без связей."""
+        stored = copy.copy(instance)
+        stored._state = copy.copy(instance._state)
+        stored._state.fields_cache = {}
+        cache.set_many(
+            {self.key(field, getattr(instance, field)): stored
+             for field in self.fields},
+            self.timeout or settings.OBJECT_CACHE_TIMEOUT)
+
+    def attach(self, instance):
+        """Подставляет связанные объекты из их кешей.
+
+        on_delete=SET_NULL меняет строки обновлением без сигналов, и в
+        кеше может остаться объект со ссылкой на удалённую запись. Такой
+        объект сбрасывается: необязательная связь становится None, а без
+        обязательной нет и самого объекта.
+        """
+        for name, related_cache in self.related.items():
+            if name in instance._state.fields_cache:
+                continue
+            related_id = getattr(instance, f'{name}_id')
+            if related_id is None:
+                continue
+            try:
+                setattr(instance, name, related_cache.get(pk=related_id))
+            except related_cache.model.DoesNotExist:
+                self.invalidate(self.model, instance)
+                if not self.model._meta.get_field(name).null:
+                    raise self.model.DoesNotExist(
+                        f'{self.model.__name__} без {name}={related_id!r}')
+                setattr(instance, name, None)
+
+    def invalidate(self, sender, instance, **kwargs):
+        cache.delete_many([
+            self.key(field, getattr(instance, field))
+            for field in self.fields])
@@ -0,0 +1,116 @@
+"""Ограничение частоты запросов по GCRA (generic cell rate algorithm).
+
+GCRA — это token bucket, записанный одним числом: для каждого
+пользователя или IP в общем кеше лежит теоретическое время прихода
+следующего запроса (TAT). Каждый пропущенный запрос сдвигает его на
+period / limit, и запрос проходит, пока TAT опережает текущее время не
+больше чем на period. Так подряд проходит не больше limit запросов, а
+дальше — по одному за period / limit секунд, без двойного всплеска на
+стыке окон, как у фиксированного окна.
+
+Кеш общий, поэтому лимит один на все воркеры gunicorn. Чтение и запись
+TAT идут под блокировкой cache.add: параллельные запросы не
+перезаписывают друг друга и не проходят сверх лимита. Отказ отдаётся
+до вызова представления и не доходит до записи в базу.
+"""
+import ipaddress
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+LOCK_TIMEOUT = 1
+WAIT_STEP = 0.005
+WAIT_STEPS = 20
+
+
+def trusted_proxy(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.TRUSTED_PROXIES)
+
+
+def client_ip(request):
+    """IP клиента.
+
+    За nginx он приходит в заголовке X-Real-IP, но заголовку верим,
+    только если запрос пришёл с адреса из TRUSTED_PROXIES: иначе клиент
+    подставлял бы в него новый адрес на каждый запрос.
+    """
+    remote = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_REAL_IP')
+    if forwarded and trusted_proxy(remote):
+        return forwarded
+    return remote
+
+
+def hit(key, limit, period, now=None):
+    """Засчитывает запрос: limit запросов за period секунд.
+
+    Возвращает 0, если запрос укладывается в лимит, иначе сколько
+    секунд ждать следующего.
+    """
+    now = time.time() if now is None else now
+    interval = period / limit
+    lock = f'{key}:lock'
+    for _ in range(WAIT_STEPS):
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(WAIT_STEP)
+    else:
+        # Блокировку держат параллельные запросы того же ключа: такой
+        # всплеск лимит и так бы не пропустил.
+        return interval
+    try:
+        tat = max(cache.get(key) or now, now) + interval
+        wait = tat - now - period
+        if wait > 0:
+            return wait
+        cache.set(key, tat, math.ceil(tat - now))
+        return 0
+    finally:
+        cache.delete(lock)
+
+
+def buckets(request, scope):
+    limits = settings.RATELIMITS.get(scope, {})
+    if 'user' in limits and request.user.is_authenticated:
+        yield f'ratelimit:{scope}:user:{request.user.pk}', limits['user']
+    if 'ip' in limits:
+        yield f'ratelimit:{scope}:ip:{client_ip(request)}', limits['ip']
+
+
+def too_many_requests(wait):
+    response = HttpResponse(
+        'Слишком много запросов, попробуйте позже.', status=429,
+        content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = math.ceil(wait)
+    return response
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Отвечает 429, если запросы methods превысили лимиты RATELIMITS[scope].
+
+    Лимиты задаются парами (запросов, секунд) отдельно для пользователя
+    и для IP.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                wait = max((
+                    hit(key, *limit)
+                    for key, limit in buckets(request, scope)
+                ), default=0)
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
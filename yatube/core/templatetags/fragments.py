@@ -0,0 +1,28 @@
+from urllib.parse import urlencode
+
+from django import template
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from ..fragments import FRAGMENTS
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def user_fragment(context, name, **params):
+    """SSI-вставка персонального фрагмента или сам фрагмент.
+
+    Переменная ssi_fragments в контексте заменяет настройку
+    USE_SSI_FRAGMENTS: так снапшоты всегда собираются со вставками.
+    """
+    if context.get('ssi_fragments', settings.USE_SSI_FRAGMENTS):
+        url = reverse('core:fragment', args=(name,))
+        if params:
+            url += '?' + urlencode(params)
+        return mark_safe(f'<!--# include virtual="{escape(url)}" -->')
+    fragment = context.template.engine.get_template(FRAGMENTS[name])
+    with context.push(**params):
+        return fragment.render(context)
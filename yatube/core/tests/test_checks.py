@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_performance_settings
+
+PRODUCTION_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+PRODUCTION_DATABASES = {
+    'default': {**settings.DATABASES['default'], 'CONN_MAX_AGE': 60},
+}
+PRODUCTION_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/yatube-test-cache',
+    },
+}
+
+
+def error_ids():
+    return {error.id for error in check_performance_settings(None)}
+
+
+class PerformanceChecksTest(SimpleTestCase):
+    def test_development_profile_is_not_checked(self):
+        """В профиле разработки проверки молчат."""
+        with override_settings(PRODUCTION=False, DEBUG=True):
+            self.assertEqual(error_ids(), set())
+
+    def test_production_profile_passes(self):
+        with override_settings(
+            PRODUCTION=True, DEBUG=False,
+            TEMPLATES=PRODUCTION_TEMPLATES,
+            DATABASES=PRODUCTION_DATABASES,
+            CACHES=PRODUCTION_CACHES,
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        ):
+            self.assertEqual(error_ids(), set())
+
+    def test_production_profile_rejects_slow_settings(self):
+        """Каждая медленная настройка в боевом профиле — ошибка."""
+        with override_settings(
+            PRODUCTION=True, DEBUG=True,
+            SESSION_ENGINE='django.contrib.sessions.backends.db',
+        ):
+            self.assertEqual(error_ids(), {
+                'core.E001', 'core.E002', 'core.E003', 'core.E004',
+                'core.E005', 'core.E006',
+            })
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from posts.caches import group_cache, post_cache
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_read_needs_no_queries(self):
+        """Пост с автором и группой читается из кеша без запросов."""
+        with self.assertNumQueries(1):
+            post_cache.get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            post = post_cache.get(pk=self.post.pk)
+            self.assertEqual(post.author.username, 'auth')
+            self.assertEqual(post.group.slug, 'test-slug')
+            self.assertEqual(group_cache.get(slug='test-slug'), self.group)
+
+    def test_missing_key_is_cached(self):
+        """Повторный запрос несуществующего ключа не идёт в базу."""
+        with self.assertNumQueries(1), self.assertRaises(Http404):
+            group_cache.get_or_404(slug='nothing')
+        with self.assertNumQueries(0), self.assertRaises(Group.DoesNotExist):
+            group_cache.get(slug='nothing')
+        Group.objects.create(title='Новая', slug='nothing')
+        self.assertEqual(group_cache.get(slug='nothing').title, 'Новая')
+
+    def test_save_refreshes_related_copies(self):
+        """Правка автора видна в посте, взятом из кеша."""
+        post_cache.get(pk=self.post.pk)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое имя'
+        author.save()
+        post = post_cache.get(pk=self.post.pk)
+        self.assertEqual(post.author.first_name, 'Новое имя')
+
+    def test_renamed_slug_is_not_served(self):
+        group_cache.get(slug='test-slug')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(group_cache.get(slug='renamed').pk, self.group.pk)
+        # Копия под старым ключом сброшена и не вернётся вместо 404.
+        cache.set(group_cache.key('slug', 'test-slug'), group)
+        with self.assertRaises(Group.DoesNotExist):
+            group_cache.get(slug='test-slug')
+
+    def test_waits_for_concurrent_loader(self):
+        """Пока другой процесс читает объект, база не опрашивается."""
+        key = group_cache.key('slug', 'test-slug')
+        cache.add(f'{key}:lock', 1)
+
+        def loaded_elsewhere(seconds):
+            cache.set(key, self.group)
+
+        with mock.patch('core.objectcache.time.sleep',
+                        side_effect=loaded_elsewhere):
+            with self.assertNumQueries(0):
+                group = group_cache.get(slug='test-slug')
+        self.assertEqual(group, self.group)
+
+    def test_waiter_keeps_foreign_lock(self):
+        """Ожидавший процесс идёт в базу, но чужую блокировку не снимает."""
+        lock = f'{group_cache.key("slug", "test-slug")}:lock'
+        cache.add(lock, 1)
+        with mock.patch('core.objectcache.time.sleep'):
+            with self.assertNumQueries(1):
+                group = group_cache.get(slug='test-slug')
+        self.assertEqual(group, self.group)
+        self.assertIsNotNone(cache.get(lock))
+
+    def test_delete_forgets_object(self):
+        post = Post.objects.create(author=self.author, text='Удаляемый')
+        post_cache.get(pk=post.pk)
+        post.delete()
+        with self.assertRaises(Post.DoesNotExist):
+            post_cache.get(pk=post.pk)
+
+    def test_deleted_group_is_detached(self):
+        """Пост удалённой группы читается из кеша без группы."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='В группе')
+        post_cache.get(pk=post.pk)
+        Group.objects.get(pk=self.group.pk).delete()
+        self.assertIsNone(post_cache.get(pk=post.pk).group)
+
+    def test_stale_copy_without_group_is_dropped(self):
+        """Копия поста со ссылкой на удалённую группу не ломает чтение."""
+        group = Group.objects.create(title='Временная', slug='temp')
+        post = Post.objects.create(
+            author=self.author, group=group, text='Во временной группе')
+        group.delete()
+        # Копия, закешированная конкурентом до обнуления group_id.
+        post_cache.store(post)
+        self.assertIsNone(post_cache.get(pk=post.pk).group)
+        self.assertIsNone(cache.get(post_cache.key('pk', post.pk)))
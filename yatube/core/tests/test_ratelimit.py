@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow
+
+from ..ratelimit import hit
+
+User = get_user_model()
+
+LIMITS = {
+    'follow': {'user': (2, 60), 'ip': (5, 60)},
+    'login': {'ip': (1, 60)},
+}
+
+
+class GcraTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_then_steady_rate(self):
+        """Подряд проходит limit запросов, дальше по одному за интервал."""
+        self.assertEqual(hit('gcra', 2, 60, now=0), 0)
+        self.assertEqual(hit('gcra', 2, 60, now=0), 0)
+        self.assertEqual(hit('gcra', 2, 60, now=0), 30)
+        self.assertEqual(hit('gcra', 2, 60, now=30), 0)
+        self.assertEqual(hit('gcra', 2, 60, now=30), 30)
+
+    def test_no_double_burst_at_window_edge(self):
+        """Всплеск в конце минуты не даёт второго в начале следующей."""
+        self.assertEqual(hit('gcra', 2, 60, now=59), 0)
+        self.assertEqual(hit('gcra', 2, 60, now=59), 0)
+        self.assertGreater(hit('gcra', 2, 60, now=61), 0)
+
+    def test_busy_key_is_refused(self):
+        cache.add('gcra:lock', 1)
+        with mock.patch('core.ratelimit.time.sleep'):
+            self.assertEqual(hit('gcra', 2, 60, now=0), 30)
+        self.assertIsNone(cache.get('gcra'))
+
+
+@override_settings(RATELIMITS=LIMITS)
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @mock.patch('core.ratelimit.time.time', return_value=30)
+    def test_follow_loop_is_throttled(self, _):
+        """Цикл подписок и отписок упирается в лимит и не пишет в базу."""
+        url = reverse('posts:profile_follow', args=(self.author.username,))
+        for _ in range(2):
+            self.assertEqual(self.authorized_client.post(url).status_code, 302)
+        Follow.objects.all().delete()
+        with self.assertNumQueries(0):
+            response = self.authorized_client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(Follow.objects.exists())
+
+    def test_limit_is_per_user(self):
+        url = reverse('posts:profile_follow', args=(self.author.username,))
+        for _ in range(3):
+            self.authorized_client.post(url)
+        other = Client()
+        other.force_login(self.author)
+        response = other.post(
+            reverse('posts:profile_follow', args=(self.user.username,)))
+        self.assertEqual(response.status_code, 302)
+
+    def test_login_is_throttled_per_ip(self):
+        """Перебор паролей с одного IP получает 429, с другого — нет."""
+        url = reverse('users:login')
+        data = {'username': 'auth', 'password': 'wrong'}
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        self.assertEqual(self.client.post(url, data).status_code, 429)
+        response = self.client.post(url, data, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(TRUSTED_PROXIES=['172.16.0.0/12'])
+    def test_real_ip_is_trusted_only_from_proxy(self):
+        """X-Real-IP от клиента не обходит лимит, а от nginx — учитывается."""
+        url = reverse('users:login')
+        data = {'username': 'auth', 'password': 'wrong'}
+        self.client.post(url, data, HTTP_X_REAL_IP='10.0.0.1')
+        response = self.client.post(url, data, HTTP_X_REAL_IP='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        proxy = {'REMOTE_ADDR': '172.18.0.5'}
+        self.client.post(url, data, HTTP_X_REAL_IP='10.0.0.1', **proxy)
+        response = self.client.post(
+            url, data, HTTP_X_REAL_IP='10.0.0.1', **proxy)
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(
+            url, data, HTTP_X_REAL_IP='10.0.0.2', **proxy)
+        self.assertEqual(response.status_code, 200)
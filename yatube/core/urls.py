@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('fragments/<slug:name>/', views.fragment, name='fragment'),
+]
@@ -1,4 +1,12 @@
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+
+from posts.counters import count_view
+from posts.forms import CommentForm
+from posts.models import Post
+
+from .fragments import FRAGMENTS
 
 
 def page_not_found(request, exception):
@@ -15,3 +23,26 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def fragment(request, name):
+    """Персональный фрагмент страницы для SSI-вставки."""
+    if name not in FRAGMENTS:
+        raise Http404
+    context = request.GET.dict()
+    if name == 'post_actions':
+        context['form'] = CommentForm()
+    if name == 'post_views':
+        try:
+            context['views'] = count_view(int(context['post_id']))
+        except (KeyError, ValueError):
+            raise Http404
+    if name == 'author_posts':
+        try:
+            context['author_posts'] = Post.objects.filter(
+                author_id=int(context['author_id'])).count()
+        except (KeyError, ValueError):
+            raise Http404
+    response = render(request, FRAGMENTS[name], context)
+    patch_cache_control(response, private=True, max_age=0)
+    return response
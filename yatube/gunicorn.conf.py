@@ -0,0 +1,5 @@
+def worker_exit(server, worker):
+    """Сбрасывает в базу просмотры, накопленные воркером."""
+    from posts.counters import view_counter
+
+    view_counter.flush()
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Post, Comment, Follow
+from .models import Group, GroupStats, Post, Comment, Follow
 
 
 @admin.register(Post)
@@ -12,6 +12,12 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+@admin.register(GroupStats)
+class GroupStatsAdmin(admin.ModelAdmin):
+    list_display = ('group', 'post_count', 'last_post_at', 'recent_authors')
+    readonly_fields = ('post_count', 'last_post_at', 'recent_authors')
+
+
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
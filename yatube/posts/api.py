@@ -0,0 +1,219 @@
+"""Read-only JSON API лент для мобильных клиентов.
+
+Ответы собираются через values() только из запрошенных колонок, листаются
+курсором и помечаются ETag, так что неизменившаяся страница стоит клиенту
+одного ответа 304 без тела.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET
+
+from users.backends import user_cache
+
+from .caches import group_cache, post_cache
+from .following import (follow_sources, followed_ids,
+                        subscribed_group_ids)
+from .models import Comment, Group, Post
+from .pagination import InvalidCursor, keyset_page, merged_keyset_page
+from .polling import latest_post_id, latest_post_id_of
+
+User = get_user_model()
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def json_response(request, payload):
+    """JSON-ответ с ETag по содержимому и 304 на If-None-Match."""
+    body = json.dumps(
+        payload, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def selected_fields(request, available):
+    """Поля из ?fields=a,b или все доступные."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return names
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.POSTS_ON_PAGE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом.')
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def serialize(rows, fields, available):
+    results = []
+    for row in rows:
+        item = {name: row[available[name]] for name in fields}
+        if item.get('image') is not None:
+            item['image'] = (
+                default_storage.url(item['image']) if item['image'] else None)
+        results.append(item)
+    return results
+
+
+def feed_response(request, queryset, available, date_field='pub_date',
+                  streams=None):
+    """Страница ленты; со streams — слияние лент-источников из queryset."""
+    try:
+        fields = selected_fields(request, available)
+        columns = {available[name] for name in fields} | {'id', date_field}
+        rows = queryset.values(*columns)
+        if streams is None:
+            rows, cursor = keyset_page(
+                rows, request.GET.get('cursor'), page_size(request),
+                date_field)
+        else:
+            rows, cursor = merged_keyset_page(
+                rows, streams, request.GET.get('cursor'),
+                page_size(request), date_field)
+    except InvalidCursor:
+        return error('Неверный курсор.', 400)
+    except BadRequest as exception:
+        return error(str(exception), 400)
+    next_url = None
+    if cursor:
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{params.urlencode()}')
+    return json_response(request, {
+        'results': serialize(rows, fields, available),
+        'next': next_url,
+    })
+
+
+@require_GET
+def index(request):
+    return feed_response(request, Post.objects.all(), POST_FIELDS)
+
+
+@require_GET
+def group_posts(request, slug):
+    try:
+        group = group_cache.get(slug=slug)
+    except Group.DoesNotExist:
+        return error('Группа не найдена.', 404)
+    return feed_response(
+        request, Post.objects.filter(group_id=group.pk), POST_FIELDS)
+
+
+@require_GET
+def profile(request, username):
+    try:
+        author = user_cache.get(username=username)
+    except User.DoesNotExist:
+        return error('Пользователь не найден.', 404)
+    return feed_response(
+        request, Post.objects.filter(author_id=author.pk), POST_FIELDS)
+
+
+@require_GET
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Нужно войти.', 401)
+    return feed_response(
+        request, Post.objects.all(), POST_FIELDS,
+        streams=follow_sources(request.user.id))
+
+
+@require_GET
+def post_detail(request, post_id):
+    try:
+        fields = selected_fields(request, POST_FIELDS)
+    except BadRequest as exception:
+        return error(str(exception), 400)
+    rows = list(Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in fields}))
+    if not rows:
+        return error('Пост не найден.', 404)
+    return json_response(request, serialize(rows, fields, POST_FIELDS)[0])
+
+
+@require_GET
+def post_comments(request, post_id):
+    try:
+        post_cache.get(pk=post_id)
+    except Post.DoesNotExist:
+        return error('Пост не найден.', 404)
+    return feed_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        date_field='created')
+
+
+def new_posts(request, queryset, latest):
+    """Число и id постов новее ?after=<id>; без запросов, если их нет."""
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        return error('after должен быть id поста.', 400)
+    if latest <= after:
+        return JsonResponse({'count': 0, 'ids': [], 'latest': latest})
+    newer = queryset.filter(id__gt=after)
+    ids = list(newer.order_by('-id').values_list(
+        'id', flat=True)[:settings.API_MAX_PAGE_SIZE])
+    count = (
+        newer.count() if len(ids) == settings.API_MAX_PAGE_SIZE
+        else len(ids))
+    return JsonResponse({'count': count, 'ids': ids, 'latest': latest})
+
+
+@require_GET
+def index_since(request):
+    return new_posts(request, Post.objects.all(), latest_post_id())
+
+
+@require_GET
+def follow_since(request):
+    if not request.user.is_authenticated:
+        return error('Нужно войти.', 401)
+    # Подписки берутся из кеша: опрос без новых постов не ходит в базу.
+    author_ids = list(followed_ids(request.user.id))
+    group_ids = list(subscribed_group_ids(request.user.id))
+    return new_posts(
+        request,
+        Post.objects.filter(
+            Q(author_id__in=author_ids) | Q(group_id__in=group_ids)),
+        latest_post_id_of(author_ids, group_ids))
@@ -0,0 +1,26 @@
+"""Кеши постов и групп по ключам из адресов (см. core.objectcache)."""
+from django.core.cache import cache
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from core.objectcache import ObjectCache
+from users.backends import user_cache
+
+from .models import Group, Post
+
+group_cache = ObjectCache(Group.objects.all(), fields=('pk', 'slug'))
+post_cache = ObjectCache(
+    Post.objects.all(),
+    related={'author': user_cache, 'group': group_cache})
+
+
+@receiver(pre_delete, sender=Group)
+def drop_group_posts(sender, instance, **kwargs):
+    """Сбрасывает посты удаляемой группы.
+
+    SET_NULL обнуляет group_id в базе без сигналов постов; после
+    удаления посты группы уже не найти, поэтому ключи собираются до него.
+    """
+    post_ids = Post.objects.filter(group=instance).values_list(
+        'pk', flat=True)
+    cache.delete_many([post_cache.key('pk', pk) for pk in post_ids])
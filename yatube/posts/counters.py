@@ -0,0 +1,98 @@
+"""Буферизованный счётчик просмотров постов.
+
+Просмотры копятся в памяти воркера и раз в VIEW_FLUSH_INTERVAL секунд
+(или когда в буфере VIEW_FLUSH_SIZE постов) уходят в базу одним
+INSERT ... ON CONFLICT DO UPDATE. Горячий пост получает одно обновление
+строки за сброс, а не по одному на просмотр. Остаток буфера сбрасывает
+хук worker_exit в gunicorn.conf.py.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from .models import Post, PostViews
+from .trending import VIEW_WEIGHT, bump_many
+
+logger = logging.getLogger(__name__)
+
+
+def write_views(pending):
+    """Прибавляет просмотры из pending и поднимает посты в популярном.
+
+    Просмотры пишутся одним upsert, рейтинги — вторым (trending.bump_many);
+    посты, удалённые, пока просмотры копились, отсекает соединение с
+    таблицей постов.
+    """
+    rows = sorted(pending.items())
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(PostViews._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(rows))
+    with transaction.atomic(), connection.cursor() as cursor:
+        # WHERE нужен SQLite, чтобы не принять ON CONFLICT за часть JOIN.
+        cursor.execute(
+            f'INSERT INTO {table} ({quote("post_id")}, {quote("total")}) '
+            f'SELECT views.column1, views.column2 '
+            f'FROM (VALUES {values}) AS views '
+            f'JOIN {quote(Post._meta.db_table)} AS post '
+            f'ON post.{quote("id")} = views.column1 WHERE TRUE '
+            f'ON CONFLICT ({quote("post_id")}) DO UPDATE '
+            f'SET {quote("total")} = {table}.{quote("total")} '
+            f'+ EXCLUDED.{quote("total")}',
+            [value for row in rows for value in row])
+        bump_many({
+            post_id: VIEW_WEIGHT * count for post_id, count in rows})
+
+
+def view_total(post_id):
+    # Без order_by() first() сортировал бы по pk, то есть по посту, и
+    # тянул бы JOIN с сортировкой из Post.Meta.ordering.
+    totals = PostViews.objects.filter(post_id=post_id).order_by().values_list(
+        'total', flat=True)[:1]
+    return totals[0] if totals else 0
+
+
+def count_view(post_id):
+    """Засчитывает просмотр поста и возвращает число его просмотров."""
+    view_counter.add(post_id)
+    return view_total(post_id)
+
+
+class ViewCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+
+    def add(self, post_id):
+        with self.lock:
+            self.pending[post_id] += 1
+            due = (
+                len(self.pending) >= settings.VIEW_FLUSH_SIZE
+                or time.monotonic() - self.flushed_at
+                >= settings.VIEW_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленное в базу; при ошибке возвращает в буфер."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            write_views(pending)
+        except DatabaseError:
+            logger.exception('Не удалось записать просмотры постов')
+            with self.lock:
+                self.pending.update(pending)
+
+
+view_counter = ViewCounter()
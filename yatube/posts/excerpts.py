@@ -0,0 +1,57 @@
+"""Анонс поста и готовый HTML его текста.
+
+Всё считается один раз при сохранении поста и хранится в колонках Post:
+лента читает только короткий excerpt_html, страница поста — text_html
+и готовый заголовок title, и ни одной из них не нужно экранировать
+текст, резать его и искать в нём хештеги при каждом показе.
+"""
+import re
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape, linebreaks
+from django.utils.safestring import mark_safe
+
+HASHTAG = re.compile(r'(?<![\w&])#(\w{1,50})')
+# Хвост строки после последнего пробела — слово, которое могло оборваться.
+LAST_WORD = re.compile(r'\s+\S*$')
+# Длина заголовка страницы поста, она же str(post).
+TITLE_LENGTH = 15
+# Поля Post, которые заполняет rendered().
+RENDERED_FIELDS = (
+    'title', 'excerpt', 'excerpt_html', 'text_html', 'truncated')
+
+
+def make_excerpt(text):
+    """Начало текста не длиннее POST_EXCERPT_LENGTH, обрезанное по слову."""
+    limit = settings.POST_EXCERPT_LENGTH
+    if len(text) <= limit:
+        return text
+    cut = LAST_WORD.sub('', text[:limit + 1])[:limit]
+    return cut.rstrip(',.;:—- ') + '…'
+
+
+def link_hashtags(html):
+    """Уже экранированный текст, в котором хештеги ведут на свои ленты."""
+    def link(match):
+        url = reverse('posts:tag', args=(match.group(1).lower(),))
+        return f'<a href="{url}">{match.group(0)}</a>'
+
+    return mark_safe(HASHTAG.sub(link, html))
+
+
+def render_text(text):
+    """Экранированный текст с абзацами, переносами и ссылками хештегов."""
+    return link_hashtags(linebreaks(escape(text)))
+
+
+def rendered(text):
+    """Значения RENDERED_FIELDS для поста с текстом text."""
+    excerpt = make_excerpt(text)
+    return {
+        'title': text[:TITLE_LENGTH],
+        'excerpt': excerpt,
+        'excerpt_html': render_text(excerpt),
+        'text_html': render_text(text),
+        'truncated': excerpt != text,
+    }
@@ -0,0 +1,162 @@
+"""Подписки на авторов и кеш множества избранных авторов.
+
+Подписка — один INSERT ... SELECT ... ON CONFLICT DO NOTHING, отписка —
+один DELETE; счётчики FollowCounts правятся в той же транзакции и
+только если строка подписки действительно появилась или исчезла.
+
+Множество авторов, на которых подписан пользователь, хранится в кеше
+отсортированным массивом id (8 байт на подписку) и проверяется двоичным
+поиском, так что вопрос «подписан ли я на X?» решается без запроса к
+базе. Массив не правится на месте: два параллельных изменения затёрли
+бы друг друга. follow и unfollow сбрасывают его, как и сигналы Follow
+при изменениях из админки, shell или миграций данных, а следующая
+проверка читает подписки из базы заново.
+
+Так же кешируются id групп, на которые подписан пользователь: вместе с
+авторами они задают ленты-источники страницы подписок.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, When
+
+from .models import Follow, FollowCounts, GroupSubscription
+from .suggestions import mark_stale
+
+User = get_user_model()
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def followed_ids(user_id):
+    """Отсортированный массив id избранных авторов пользователя."""
+    authors = cache.get(following_key(user_id))
+    if authors is None:
+        authors = array('q', Follow.objects.filter(
+            user_id=user_id).order_by('author_id').values_list(
+            'author_id', flat=True))
+        cache.set(following_key(user_id), authors,
+                  settings.FOLLOWING_CACHE_TIMEOUT)
+    return authors
+
+
+def contains(authors, author_id):
+    position = bisect_left(authors, author_id)
+    return position < len(authors) and authors[position] == author_id
+
+
+def is_following(user, author_id):
+    return user.is_authenticated and contains(
+        followed_ids(user.id), author_id)
+
+
+def drop_following(user_id):
+    cache.delete(following_key(user_id))
+
+
+def groups_key(user_id):
+    return f'following:groups:{user_id}'
+
+
+def subscribed_group_ids(user_id):
+    """Массив id групп, на которые подписан пользователь."""
+    group_ids = cache.get(groups_key(user_id))
+    if group_ids is None:
+        group_ids = array('q', GroupSubscription.objects.filter(
+            user_id=user_id).order_by('group_id').values_list(
+            'group_id', flat=True))
+        cache.set(groups_key(user_id), group_ids,
+                  settings.FOLLOWING_CACHE_TIMEOUT)
+    return group_ids
+
+
+def drop_subscriptions(user_id):
+    cache.delete(groups_key(user_id))
+
+
+def follow_sources(user_id):
+    """Фильтры лент-источников страницы подписок: авторы и группы."""
+    group_ids = subscribed_group_ids(user_id)
+    return [
+        *({'author_id': author_id} for author_id in followed_ids(user_id)),
+        *({'group_id': group_id} for group_id in group_ids),
+    ]
+
+
+def shift_counts(user_id, author_id, delta):
+    """Меняет на delta подписки user_id и подписчиков author_id."""
+    FollowCounts.objects.filter(user_id__in=(user_id, author_id)).update(
+        following=F('following') + Case(
+            When(user_id=user_id, then=delta), default=0),
+        followers=F('followers') + Case(
+            When(user_id=author_id, then=delta), default=0),
+    )
+
+
+def follow(user_id, username):
+    """Подписывает на автора username.
+
+    Возвращает id автора или None, если подписка уже была, автора нет
+    или это сам пользователь.
+    """
+    quote = connection.ops.quote_name
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(Follow._meta.db_table)} '
+            f'({quote("user_id")}, {quote("author_id")}) '
+            f'SELECT %s, {quote("id")} FROM {quote(User._meta.db_table)} '
+            f'WHERE {quote("username")} = %s AND {quote("id")} <> %s '
+            f'ON CONFLICT ({quote("user_id")}, {quote("author_id")}) '
+            f'DO NOTHING RETURNING {quote("author_id")}',
+            [user_id, username, user_id])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        shift_counts(user_id, row[0], 1)
+    drop_following(user_id)
+    mark_stale(user_id)
+    return row[0]
+
+
+def unfollow(user_id, username):
+    """Отписывает от автора username; возвращает его id или None."""
+    quote = connection.ops.quote_name
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(Follow._meta.db_table)} '
+            f'WHERE {quote("user_id")} = %s AND {quote("author_id")} = ('
+            f'SELECT {quote("id")} FROM {quote(User._meta.db_table)} '
+            f'WHERE {quote("username")} = %s) '
+            f'RETURNING {quote("author_id")}',
+            [user_id, username])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        shift_counts(user_id, row[0], -1)
+    drop_following(user_id)
+    mark_stale(user_id)
+    return row[0]
+
+
+def rebuild_follow_counts():
+    """Пересчитывает счётчики подписок всех пользователей с нуля."""
+    followers = dict(Follow.objects.values('author_id').annotate(
+        total=Count('id')).values_list('author_id', 'total'))
+    following = dict(Follow.objects.values('user_id').annotate(
+        total=Count('id')).values_list('user_id', 'total'))
+    counts = [
+        FollowCounts(
+            user_id=user_id, followers=followers.get(user_id, 0),
+            following=following.get(user_id, 0))
+        for user_id in User.objects.values_list('id', flat=True).iterator()
+    ]
+    with transaction.atomic():
+        FollowCounts.objects.all().delete()
+        FollowCounts.objects.bulk_create(counts, batch_size=1000)
+    return len(counts)
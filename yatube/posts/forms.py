@@ -1,5 +1,7 @@
 from django import forms
+from django.conf import settings
 
+from .minhash import find_similar
 from .models import Comment, Post
 
 
@@ -18,6 +20,17 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение к новому посту',
         }
 
+    def clean_text(self):
+        """Отклоняет текст, почти одинаковые копии которого уже есть."""
+        text = self.cleaned_data['text']
+        similar = find_similar(
+            text, settings.DUPLICATE_POST_SIMILARITY,
+            exclude=self.instance.pk, post=self.instance)
+        if len(similar) >= settings.DUPLICATE_POST_LIMIT:
+            raise forms.ValidationError(
+                'Почти такой же текст уже опубликован несколько раз.')
+        return text
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,215 @@
+"""Лайки постов.
+
+Лайк вставляется как INSERT ... ON CONFLICT DO NOTHING, поэтому повтор
+ничего не меняет, а счётчик растёт только при настоящей вставке. Для
+каждого пользователя в кеше лежит фильтр Блума по лайкнутым постам:
+если ни один пост страницы в него не попадает, запрос «что я лайкнул»
+не нужен.
+
+Фильтр не дописывается на месте: два параллельных лайка затёрли бы бит
+друг друга. Лайк получает номер атомарным cache.incr и кладёт id поста
+в кеш под этим номером, а фильтр-основа помнит номер последнего
+учтённого лайка. Чтение берёт основу и добирает недостающие номера
+одним get_many; новая основа пишется поверх, и даже если её затрёт более
+старая, та просто доберёт больше номеров. По базе фильтр строится
+только при пустом кеше, после вытеснения номеров или когда основа
+переполнена и её пора увеличить.
+"""
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Like, LikeCounter
+
+BLOOM_HASHES = 4
+# Бит фильтра на один лайк; при 16 битах и 4 хешах ложных срабатываний
+# около 0,2%.
+BLOOM_BITS_PER_LIKE = 16
+BLOOM_MIN_BITS = 1024
+# Сколько новых лайков чтение добирает поверх основы; хвост длиннее
+# бывает, только если счётчик начат заново, и тогда фильтр строится
+# по базе.
+BLOOM_RECENT_LIMIT = 256
+
+
+def bloom_key(user_id):
+    return f'likes:bloom:{user_id}'
+
+
+def recent_count_key(user_id):
+    return f'likes:recent:{user_id}'
+
+
+def recent_key(user_id, number):
+    return f'likes:recent:{user_id}:{number}'
+
+
+def recent_count(user_id):
+    key = recent_count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        # Начинаем с времени, а не с нуля: после вытеснения счётчика
+        # основа со старым номером не примет новые лайки за учтённые.
+        cache.add(key, time.time_ns(), None)
+        count = cache.get(key)
+    return count
+
+
+def bloom_positions(post_id, size):
+    digest = hashlib.blake2b(str(post_id).encode(), digest_size=16).digest()
+    return [
+        int.from_bytes(digest[4 * number:4 * number + 4], 'big') % size
+        for number in range(BLOOM_HASHES)
+    ]
+
+
+def bloom_add(bloom, post_id):
+    size, bits = bloom
+    for position in bloom_positions(post_id, size):
+        bits |= 1 << position
+    return size, bits
+
+
+def bloom_contains(bloom, post_id):
+    size, bits = bloom
+    return all(
+        bits >> position & 1 for position in bloom_positions(post_id, size))
+
+
+def build_bloom(user_id, count):
+    """Строит фильтр по базе и кладёт его основой с номером count."""
+    liked = list(Like.objects.filter(user_id=user_id).values_list(
+        'post_id', flat=True))
+    # Запас вдвое: основа вмещает столько же новых лайков без перестройки.
+    bloom = (max(BLOOM_MIN_BITS, 2 * len(liked) * BLOOM_BITS_PER_LIKE), 0)
+    for post_id in liked:
+        bloom = bloom_add(bloom, post_id)
+    cache.set(
+        bloom_key(user_id), (count, len(liked), bloom),
+        settings.LIKE_FILTER_TIMEOUT)
+    return bloom
+
+
+def user_bloom(user_id):
+    """Фильтр лайков пользователя: основа из кеша и новые лайки."""
+    # Номер читается до основы: лайк с большим номером уже в базе.
+    count = recent_count(user_id)
+    base = cache.get(bloom_key(user_id))
+    if base is None:
+        return build_bloom(user_id, count)
+    covered, items, bloom = base
+    if covered >= count:
+        return bloom
+    if count - covered > BLOOM_RECENT_LIMIT:
+        return build_bloom(user_id, count)
+    keys = [
+        recent_key(user_id, number)
+        for number in range(covered + 1, count + 1)]
+    recent = cache.get_many(keys)
+    items += len(keys)
+    if len(recent) < len(keys) or items * BLOOM_BITS_PER_LIKE > bloom[0]:
+        # Номер вытеснен или ещё не записан, либо основа переполнена.
+        return build_bloom(user_id, count)
+    for post_id in recent.values():
+        bloom = bloom_add(bloom, post_id)
+    cache.set(
+        bloom_key(user_id), (count, items, bloom),
+        settings.LIKE_FILTER_TIMEOUT)
+    return bloom
+
+
+def remember_like(user_id, post_id):
+    try:
+        number = cache.incr(recent_count_key(user_id))
+    except ValueError:
+        # Счётчика нет: основа могла учесть номера, которые он выдаст
+        # заново, так что следующее чтение строит фильтр по базе.
+        cache.delete(bloom_key(user_id))
+        return
+    cache.set(
+        recent_key(user_id, number), post_id, settings.LIKE_FILTER_TIMEOUT)
+
+
+def add_to_counter(post_id, delta):
+    quote = connection.ops.quote_name
+    table = quote(LikeCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({quote("post_id")}, {quote("shard")}, '
+            f'{quote("total")}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({quote("post_id")}, {quote("shard")}) DO UPDATE '
+            f'SET {quote("total")} = {table}.{quote("total")} '
+            f'+ EXCLUDED.{quote("total")}',
+            [post_id, random.randrange(settings.LIKE_COUNTER_SHARDS), delta])
+
+
+def like(user, post_id):
+    """Ставит лайк; возвращает False, если он уже стоял."""
+    quote = connection.ops.quote_name
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(Like._meta.db_table)} ({quote("user_id")}, '
+            f'{quote("post_id")}, {quote("created")}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({quote("user_id")}, {quote("post_id")}) '
+            f'DO NOTHING RETURNING {quote("id")}',
+            [user.pk, post_id,
+             connection.ops.adapt_datetimefield_value(timezone.now())])
+        if cursor.fetchone() is None:
+            return False
+        add_to_counter(post_id, 1)
+    remember_like(user.pk, post_id)
+    return True
+
+
+def unlike(user, post_id):
+    """Снимает лайк; возвращает False, если его не было.
+
+    Бит в фильтре остаётся: лишний бит стоит только лишнего запроса.
+    """
+    with transaction.atomic(savepoint=False):
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            add_to_counter(post_id, -1)
+    return bool(deleted)
+
+
+def like_counts(post_ids):
+    return dict(LikeCounter.objects.filter(post_id__in=post_ids).values(
+        'post_id').annotate(likes=Sum('total')).values_list(
+        'post_id', 'likes'))
+
+
+def liked_by(user, post_ids):
+    """Какие из post_ids лайкнул user; без запроса, если фильтр молчит."""
+    bloom = user_bloom(user.pk)
+    candidates = [
+        post_id for post_id in post_ids if bloom_contains(bloom, post_id)]
+    if not candidates:
+        return set()
+    return set(Like.objects.filter(
+        user=user, post_id__in=candidates).values_list('post_id', flat=True))
+
+
+def attach_likes(posts, user=None):
+    """Проставляет постам like_count и, для вошедшего user, liked.
+
+    Возвращает список постов; на страницу уходит не больше трёх запросов:
+    суммы счётчиков, фильтр при пустом кеше и лайки пользователя.
+    """
+    posts = list(posts)
+    post_ids = [post.pk for post in posts]
+    counts = like_counts(post_ids)
+    liked = (
+        liked_by(user, post_ids)
+        if user is not None and user.is_authenticated else None)
+    for post in posts:
+        post.like_count = counts.get(post.pk, 0)
+        if liked is not None:
+            post.liked = post.pk in liked
+    return posts
@@ -0,0 +1,368 @@
+import http.cookiejar
+import json
+import math
+import random
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict, namedtuple
+from contextlib import nullcontext
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+VIEWS = (
+    'index', 'group_list', 'profile', 'post_detail', 'follow_index',
+    'create_post', 'add_comment',
+)
+DEFAULT_MIX = (
+    'index=40,group_list=15,profile=15,post_detail=20,'
+    'follow_index=6,create_post=2,add_comment=2'
+)
+LOGIN_REQUIRED = {'follow_index', 'create_post', 'add_comment'}
+SAMPLE_SIZE = 200
+
+Sample = namedtuple('Sample', 'status elapsed ttfb queries memory')
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(share * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in VIEWS:
+            raise CommandError(f'Неизвестное представление в смеси: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class InProcessTransport:
+    """Прогоняет запросы через WSGI-обработчик Django в этом процессе.
+
+    Запрос на запись идёт в транзакции, которая откатывается: замер не
+    оставляет в базе постов и комментариев. Кеш при этом не
+    откатывается, и метки новых постов могут указывать на откатанные id.
+    """
+
+    def __init__(self, users, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.clients = {None: Client()}
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            self.clients[user.pk] = client
+
+    def request(self, method, url, data, user):
+        client = self.clients[user.pk if user else None]
+        if self.trace_memory:
+            tracemalloc.start()
+        writes = (
+            transaction.atomic() if method != 'get' else nullcontext())
+        with writes, CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            ttfb = None
+            if response.streaming:
+                # Потоковый ответ рендерится по мере чтения.
+                for _ in response.streaming_content:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - started
+            elapsed = time.perf_counter() - started
+            if method != 'get':
+                transaction.set_rollback(True)
+        memory = None
+        if self.trace_memory:
+            memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return Sample(response.status_code, elapsed,
+                      elapsed if ttfb is None else ttfb, len(queries),
+                      memory)
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Ходит по HTTP в уже запущенный gunicorn или nginx."""
+
+    def __init__(self, base_url, password):
+        self.base_url = base_url.rstrip('/')
+        self.password = password
+        self.sessions = {}
+
+    def session(self, user):
+        key = user.pk if user else None
+        if key not in self.sessions:
+            jar = http.cookiejar.CookieJar()
+            opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(jar), NoRedirect)
+            self.sessions[key] = opener, jar
+            if user:
+                self.call(opener, 'get', reverse('users:login'), None)
+                self.call(opener, 'post', reverse('users:login'), {
+                    'username': user.username,
+                    'password': self.password,
+                    'csrfmiddlewaretoken': self.csrf_token(jar),
+                })
+        return self.sessions[key]
+
+    @staticmethod
+    def csrf_token(jar):
+        for cookie in jar:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def call(self, opener, method, url, data):
+        """Код ответа, время до заголовков и полное время запроса."""
+        body = None
+        if method == 'post':
+            body = urllib.parse.urlencode(data or {}).encode()
+        started = time.perf_counter()
+        try:
+            with opener.open(self.base_url + url, data=body) as response:
+                ttfb = time.perf_counter() - started
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status, ttfb = error.code, time.perf_counter() - started
+        return status, ttfb, time.perf_counter() - started
+
+    def request(self, method, url, data, user):
+        opener, jar = self.session(user)
+        if method == 'post':
+            data = dict(data, csrfmiddlewaretoken=self.csrf_token(jar))
+        status, ttfb, elapsed = self.call(opener, method, url, data)
+        return Sample(status, elapsed, ttfb, None, None)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает основные страницы заданной смесью запросов и выводит '
+        'перцентили задержки, пропускную способность и число SQL-запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса представлений: имя_url=вес через запятую.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько авторизованных пользователей участвует в прогоне.')
+        parser.add_argument(
+            '--url', default=None,
+            help='Адрес запущенного сервера; без него запросы идут в WSGI '
+                 'приложение внутри процесса.')
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль пользователей для входа при прогоне по HTTP.')
+        parser.add_argument('--baseline', help='Файл с сохранённым базовым '
+                                               'прогоном для сравнения.')
+        parser.add_argument('--save', help='Куда сохранить результаты.')
+        parser.add_argument(
+            '--trace-memory', action='store_true',
+            help='Замерять пик выделенной памяти на запрос (tracemalloc).')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового прогона.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        mix = parse_mix(options['mix'])
+        self.sample_keys()
+        users = self.pick_users(options['users'])
+        if not self.post_ids or not users:
+            raise CommandError(
+                'База пуста: сначала заполните её командой seed_data.')
+        if options['url']:
+            if LOGIN_REQUIRED & set(mix) and not options['password']:
+                raise CommandError('Для входа по HTTP нужен --password.')
+            transport = HttpTransport(options['url'], options['password'])
+            report = self.run(transport, mix, users, options)
+        else:
+            transport = InProcessTransport(users, options['trace_memory'])
+            # Прогон в процессе идёт от нескольких пользователей с одного
+            # адреса: лимиты частоты превратили бы его в замер ответов 429.
+            with override_settings(RATELIMITS={}):
+                report = self.run(transport, mix, users, options)
+        self.print_report(report)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+        if options['baseline']:
+            self.check_baseline(report, options)
+
+    def run(self, transport, mix, users, options):
+        names, weights = zip(*mix.items())
+        for _ in range(options['warmup']):
+            self.run_one(transport, self.rng.choices(names, weights)[0],
+                         users)
+        results = defaultdict(list)
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            name = self.rng.choices(names, weights)[0]
+            results[name].append(self.run_one(transport, name, users))
+        wall = time.perf_counter() - started
+        return self.summarize(results, options['requests'], wall)
+
+    def check_baseline(self, report, options):
+        with open(options['baseline']) as file:
+            baseline = json.load(file)
+        regressions = self.compare(report, baseline, options['tolerance'])
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(line))
+        if regressions:
+            raise CommandError('Производительность ухудшилась.')
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено.'))
+
+    def sample_keys(self):
+        """Выбирает случайные ключи, не сканируя большие таблицы."""
+        bounds = Post.objects.aggregate(low=Min('id'), high=Max('id'))
+        self.post_ids = []
+        if bounds['low'] is not None:
+            for _ in range(SAMPLE_SIZE):
+                pivot = self.rng.randint(bounds['low'], bounds['high'])
+                post_id = Post.objects.filter(id__gte=pivot).order_by(
+                    'id').values_list('id', flat=True).first()
+                self.post_ids.append(post_id)
+        self.slugs = list(
+            Group.objects.order_by('id').values_list('slug', flat=True)[
+                :SAMPLE_SIZE])
+        self.usernames = list(
+            Post.objects.filter(id__in=self.post_ids).values_list(
+                'author__username', flat=True).distinct())
+
+    def pick_users(self, count):
+        """Вошедшие участники: по возможности те, у кого есть подписки."""
+        user_ids = list(
+            Follow.objects.order_by('user_id').values_list(
+                'user_id', flat=True).distinct()[:count])
+        users = User.objects.order_by('id')
+        if user_ids:
+            users = users.filter(id__in=user_ids)
+        return list(users[:count])
+
+    def run_one(self, transport, name, users):
+        rng = self.rng
+        user = rng.choice(users) if (
+            name in LOGIN_REQUIRED or rng.random() < 0.5) else None
+        method, data = 'get', {}
+        if name == 'index':
+            url = reverse('posts:index')
+        elif name == 'group_list':
+            url = reverse('posts:group_list', args=(rng.choice(self.slugs),))
+        elif name == 'profile':
+            url = reverse('posts:profile', args=(rng.choice(self.usernames),))
+        elif name == 'post_detail':
+            url = reverse('posts:post_detail',
+                          args=(rng.choice(self.post_ids),))
+        elif name == 'follow_index':
+            url = reverse('posts:follow_index')
+        elif name == 'create_post':
+            url = reverse('posts:create_post')
+            method, data = 'post', {'text': f'Нагрузочный пост {rng.random()}'}
+        else:
+            url = reverse('posts:add_comment',
+                          args=(rng.choice(self.post_ids),))
+            method, data = 'post', {'text': f'Комментарий {rng.random()}'}
+        if name in ('index', 'group_list', 'profile', 'follow_index'):
+            url += f'?page={rng.randint(1, 5)}'
+        return transport.request(method, url, data, user)
+
+    def summarize(self, results, total, wall):
+        views = {}
+        for name, samples in sorted(results.items()):
+            latency = [sample.elapsed for sample in samples]
+            queries = [sample.queries for sample in samples
+                       if sample.queries is not None]
+            memory = [sample.memory for sample in samples
+                      if sample.memory is not None]
+            views[name] = {
+                'count': len(samples),
+                'errors': sum(sample.status >= 500 for sample in samples),
+                'rejected': sum(
+                    400 <= sample.status < 500 for sample in samples),
+                'p50': percentile(latency, 0.50) * 1000,
+                'p95': percentile(latency, 0.95) * 1000,
+                'p99': percentile(latency, 0.99) * 1000,
+                'ttfb_p50': percentile(
+                    [sample.ttfb for sample in samples], 0.50) * 1000,
+                'queries': sum(queries) / len(queries) if queries else None,
+                'memory_kb': max(memory) / 1024 if memory else None,
+            }
+        return {'throughput': total / wall, 'views': views}
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"view":<14}{"count":>7}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"p99 ms":>10}{"ttfb ms":>10}{"queries":>9}{"peak KB":>9}'
+            f'{"errors":>8}{"4xx":>6}')
+        for name, view in report['views'].items():
+            queries = (
+                '-' if view['queries'] is None else f'{view["queries"]:.1f}')
+            memory = (
+                '-' if view.get('memory_kb') is None
+                else f'{view["memory_kb"]:.0f}')
+            self.stdout.write(
+                f'{name:<14}{view["count"]:>7}{view["p50"]:>10.2f}'
+                f'{view["p95"]:>10.2f}{view["p99"]:>10.2f}'
+                f'{view["ttfb_p50"]:>10.2f}{queries:>9}{memory:>9}'
+                f'{view["errors"]:>8}{view.get("rejected", 0):>6}')
+        self.stdout.write(f'Пропускная способность: '
+                          f'{report["throughput"]:.1f} запросов/с')
+        rejected = sum(
+            view.get('rejected', 0) for view in report['views'].values())
+        if rejected:
+            self.stdout.write(self.style.WARNING(
+                f'Ответов 4xx: {rejected}. Отказы (например, 429 от '
+                f'лимитов частоты) быстрее настоящих ответов и занижают '
+                f'задержки.'))
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, view in report['views'].items():
+            base = baseline['views'].get(name)
+            if not base:
+                continue
+            if view['p95'] > base['p95'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {view["p95"]:.2f} мс против '
+                    f'{base["p95"]:.2f} мс в базовом прогоне')
+            if (view['queries'] is not None and base['queries'] is not None
+                    and view['queries'] > base['queries'] + 0.5):
+                regressions.append(
+                    f'{name}: {view["queries"]:.1f} запросов против '
+                    f'{base["queries"]:.1f} в базовом прогоне')
+            if view.get('rejected', 0) > base.get('rejected', 0):
+                regressions.append(
+                    f'{name}: {view["rejected"]} ответов 4xx против '
+                    f'{base.get("rejected", 0)} в базовом прогоне')
+        if report['throughput'] < baseline['throughput'] * (1 - tolerance):
+            regressions.append(
+                f'пропускная способность {report["throughput"]:.1f} '
+                f'против {baseline["throughput"]:.1f} запросов/с')
+        return regressions
@@ -0,0 +1,29 @@
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.snapshots import cold_posts, write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает статические копии страниц постов без недавней '
+        'активности, которые nginx отдаёт без обращения к Django.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить все копии перед сборкой.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            shutil.rmtree(settings.SNAPSHOT_ROOT, ignore_errors=True)
+        built = 0
+        for post_id in cold_posts().order_by().values_list(
+                'id', flat=True).iterator():
+            write_snapshot(post_id)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Собрано статических страниц: {built}'))
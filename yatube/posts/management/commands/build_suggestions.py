@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import StaleSuggestions
+from posts.suggestions import FollowGraph, write_suggestions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает рекомендации «кого почитать» по графу подписок. По '
+        'умолчанию только для пользователей, чьи подписки изменились.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рекомендации всех пользователей.')
+        parser.add_argument(
+            '--top', type=int, default=settings.FOLLOW_SUGGESTIONS,
+            help='Сколько авторов рекомендовать каждому.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        stale = StaleSuggestions.objects.filter(changed__lte=started)
+        if options['full']:
+            user_ids = User.objects.order_by('id').values_list(
+                'id', flat=True).iterator()
+        else:
+            user_ids = iter(list(User.objects.filter(
+                id__in=stale.values('user_id')
+            ).order_by('id').values_list('id', flat=True)))
+        graph = FollowGraph()
+        self.stdout.write(
+            f'Граф: {len(graph.ids)} пользователей, '
+            f'{len(graph.targets)} подписок')
+        total = 0
+        while True:
+            batch = list(islice(user_ids, options['batch_size']))
+            if not batch:
+                break
+            total += write_suggestions(graph, batch, options['top'])
+        # Изменения, случившиеся во время расчёта, дождутся следующего.
+        stale.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано рекомендаций: {total}'))
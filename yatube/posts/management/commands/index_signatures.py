@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.minhash import index_rows
+from posts.models import Post, PostBand, PostSignature
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит MinHash-подписи и корзины LSH для постов без подписи, '
+        'читая посты пачками по id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить все подписи и построить их заново.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            PostBand.objects.all().delete()
+            PostSignature.objects.all().delete()
+        batch_size = options['batch_size']
+        posts = Post.objects.filter(signature__isnull=True).order_by(
+            'id').values_list('id', 'text')
+        last_id = 0
+        total = 0
+        while True:
+            chunk = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            signatures, bands = index_rows(chunk)
+            with transaction.atomic():
+                PostSignature.objects.bulk_create(signatures)
+                PostBand.objects.bulk_create(bands, batch_size=500)
+            total += len(signatures)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.excerpts import RENDERED_FIELDS
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает анонсы и готовый HTML постов, читая посты пачками '
+        'по id. Нужен после смены POST_EXCERPT_LENGTH или адресов лент '
+        'хештегов и для постов, вставленных в обход Post.save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.order_by('id').only('id', 'text')
+        last_id = 0
+        total = 0
+        while True:
+            chunk = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            for post in chunk:
+                post.render_text()
+            Post.objects.bulk_update(chunk, RENDERED_FIELDS)
+            total += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {total}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.following import rebuild_follow_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает с нуля число подписчиков и подписок пользователей.'
+
+    def handle(self, *args, **options):
+        total = rebuild_follow_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счётчики подписок: {total}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_group_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает с нуля статистику групп: число постов, дату '
+        'последнего поста и недавних авторов.'
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_group_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитана статистика групп: {total}'))
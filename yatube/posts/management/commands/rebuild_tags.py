@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.tags import rebuild_tags
+
+
+class Command(BaseCommand):
+    help = 'Строит индекс хештегов заново по текстам всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_tags(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в индексе хештегов: {total}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ленту популярного по комментариям за последние '
+        'TRENDING_WINDOW_DAYS дней и удаляет рейтинги остальных постов.'
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_trending()
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов в рейтинге: {total}'))
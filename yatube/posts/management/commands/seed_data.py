@@ -0,0 +1,276 @@
+import io
+import os
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts.excerpts import RENDERED_FIELDS, rendered
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+IMAGE_DIR = 'posts/seed'
+
+
+def power_law(size, alpha):
+    """Накопленные веса распределения Ципфа для rng.choices."""
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(size)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def copy_escape(value):
+    """Экранирует значение для текстового формата COPY."""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует большой воспроизводимый набор данных: пользователей, '
+        'группы, посты с картинками, подписки и комментарии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько картинок сгенерировать для постов.')
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой.')
+        parser.add_argument(
+            '--max-comments', type=int, default=500,
+            help='Максимум комментариев у одного поста.')
+        parser.add_argument(
+            '--max-follows', type=int, default=1000,
+            help='Максимум подписок у одного пользователя.')
+        parser.add_argument(
+            '--days', type=int, default=3 * 365,
+            help='За сколько дней распределить даты публикаций.')
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов.')
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль для всех пользователей (по умолчанию непригодный).')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.words = self.fake.words(nb=1000)
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом «{prefix}_» уже есть, '
+                'укажите другой --prefix.')
+
+        with transaction.atomic():
+            user_ids = self.create_users()
+            group_ids = self.create_groups()
+        images = self.create_images()
+        with transaction.atomic():
+            self.create_posts(user_ids, group_ids, images)
+        with transaction.atomic():
+            self.create_follows(user_ids)
+        with transaction.atomic():
+            self.create_comments(user_ids)
+        # Строки вставлены в обход сигналов: пересчитываем производные
+        # таблицы целиком.
+        call_command('rebuild_group_stats', stdout=self.stdout)
+        call_command('rebuild_trending', stdout=self.stdout)
+        call_command('rebuild_follow_counts', stdout=self.stdout)
+        call_command('build_suggestions', full=True, stdout=self.stdout)
+        call_command('index_signatures', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы.'))
+
+    def write(self, model, columns, rows):
+        """Пишет строки пачками: COPY в PostgreSQL, INSERT в остальные СУБД."""
+        table = connection.ops.quote_name(model._meta.db_table)
+        column_list = ', '.join(
+            connection.ops.quote_name(column) for column in columns)
+        total = 0
+        with connection.cursor() as cursor:
+            for batch in batched(rows, self.batch_size):
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    for row in batch:
+                        buffer.write(
+                            '\t'.join(map(copy_escape, row)) + '\n')
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f'COPY {table} ({column_list}) FROM STDIN', buffer)
+                else:
+                    placeholders = ', '.join(['%s'] * len(columns))
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({column_list}) '
+                        f'VALUES ({placeholders})', batch)
+                total += len(batch)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+        return total
+
+    def adapt(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(self.options['password'])
+        joined = self.adapt(self.now - timedelta(days=self.options['days']))
+        fake = self.fake
+        self.write(User, (
+            'password', 'is_superuser', 'username', 'first_name',
+            'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            (password, False, f'{prefix}_{number}', fake.first_name(),
+             fake.last_name(), f'{prefix}_{number}@example.com',
+             False, True, joined)
+            for number in range(self.options['users'])
+        ))
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).order_by('id').values_list('id', flat=True))
+        # Порядок в списке задаёт популярность пользователя.
+        self.rng.shuffle(user_ids)
+        return user_ids
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        self.write(Group, ('title', 'slug', 'description'), (
+            (self.fake.catch_phrase()[:200], f'{prefix}-{number}',
+             self.fake.paragraph())
+            for number in range(self.options['groups'])
+        ))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-'
+        ).order_by('id').values_list('id', flat=True))
+        self.rng.shuffle(group_ids)
+        return group_ids
+
+    def create_images(self):
+        """Сохраняет в MEDIA_ROOT набор картинок, общий для всех постов."""
+        directory = os.path.join(settings.MEDIA_ROOT, IMAGE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        images = []
+        for number in range(self.options['images']):
+            name = f'{IMAGE_DIR}/{self.options["prefix"]}_{number}.png'
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (960, 339), color).save(
+                os.path.join(settings.MEDIA_ROOT, name))
+            images.append(name)
+        return images
+
+    def text(self, mean_words):
+        length = min(int(self.rng.lognormvariate(mean_words, 1)) + 1, 2000)
+        return ' '.join(self.rng.choices(self.words, k=length)).capitalize()
+
+    def create_posts(self, user_ids, group_ids, images):
+        rng = self.rng
+        authors = power_law(len(user_ids), self.options['alpha'])
+        groups = power_law(len(group_ids), self.options['alpha'])
+        count = self.options['posts']
+        # Посты идут по возрастанию даты, как при обычной публикации.
+        step = self.options['days'] * 86400 / max(count, 1)
+        moment = self.now - timedelta(days=self.options['days'])
+
+        def rows():
+            nonlocal moment
+            for _ in range(count):
+                moment += timedelta(seconds=rng.expovariate(1 / step))
+                group = (
+                    rng.choices(group_ids, cum_weights=groups)[0]
+                    if group_ids and rng.random() < 0.7 else None
+                )
+                image = (
+                    rng.choice(images)
+                    if images and rng.random() < self.options['image_share']
+                    else ''
+                )
+                text = self.text(3)
+                html = rendered(text)
+                yield (
+                    text, *(html[field] for field in RENDERED_FIELDS),
+                    self.adapt(min(moment, self.now)),
+                    rng.choices(user_ids, cum_weights=authors)[0],
+                    group, image,
+                )
+
+        self.write(Post, (
+            'text', *RENDERED_FIELDS, 'pub_date', 'author_id', 'group_id',
+            'image',
+        ), rows())
+
+    def create_follows(self, user_ids):
+        """Граф подписок со степенным распределением числа подписчиков."""
+        rng = self.rng
+        authors = power_law(len(user_ids), self.options['alpha'])
+        max_follows = min(self.options['max_follows'], len(user_ids) - 1)
+
+        def rows():
+            for user_id in user_ids:
+                wanted = min(int(rng.paretovariate(1.2)) - 1, max_follows)
+                following = set()
+                for _ in range(wanted * 3):
+                    if len(following) >= wanted:
+                        break
+                    author_id = rng.choices(user_ids, cum_weights=authors)[0]
+                    if author_id != user_id:
+                        following.add(author_id)
+                for author_id in sorted(following):
+                    yield user_id, author_id
+
+        self.write(Follow, ('user_id', 'author_id'), rows())
+
+    def create_comments(self, user_ids):
+        """Комментарии с сильным перекосом: у большинства постов их нет."""
+        rng = self.rng
+        max_comments = self.options['max_comments']
+        posts = Post.objects.filter(
+            author__username__startswith=f'{self.options["prefix"]}_'
+        ).order_by('id').values_list('id', 'pub_date')
+
+        def rows():
+            last_id = 0
+            while True:
+                chunk = list(posts.filter(id__gt=last_id)[:self.batch_size])
+                if not chunk:
+                    return
+                last_id = chunk[-1][0]
+                for post_id, pub_date in chunk:
+                    count = min(int(rng.paretovariate(1.2)) - 1, max_comments)
+                    for _ in range(count):
+                        created = pub_date + timedelta(
+                            hours=rng.expovariate(1 / 24))
+                        yield (
+                            post_id, rng.choice(user_ids), self.text(2),
+                            self.adapt(min(created, self.now)),
+                        )
+
+        self.write(Comment, ('post_id', 'author_id', 'text', 'created'),
+                   rows())
@@ -0,0 +1,201 @@
+"""Поиск почти одинаковых постов по MinHash и LSH.
+
+Текст превращается в множество пар соседних слов, каждый шингл
+хешируется один раз crc32. Подпись — SIGNATURE_SIZE наименьших хешей
+(bottom-k): по двум подписям коэффициент Жаккара оценивается долей
+общих значений среди SIGNATURE_SIZE наименьших хешей их объединения, а
+для коротких текстов, где в подпись попадают все шинглы, считается
+точно.
+
+Для LSH подпись раскладывается по ячейкам одной перестановкой (one
+permutation hashing): младшие биты хеша выбирают ячейку, в ней остаётся
+наименьший хеш, а пустая ячейка берёт значение первой непустой в своём
+фиксированном случайном порядке PROBES. Ячейки режутся на BANDS полос,
+хеш каждой полосы пишется в PostBand: посты, похожие больше чем
+примерно на (1 / BANDS) ** (1 / ROWS), почти наверняка совпадут хотя бы
+в одной корзине. Проверка нового текста — один поиск по индексу корзин
+и чтение подписей найденных кандидатов, без просмотра постов.
+
+Подпись стоит один проход по словам текста: на 4 тысячи символов
+уходят доли миллисекунды. После смены шинглов или схемы подписи индекс
+пересобирается командой index_signatures --clear.
+"""
+import hashlib
+import random
+import re
+import struct
+import zlib
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import PostBand, PostSignature
+
+# Слов в шингле.
+SHINGLE_SIZE = 2
+BANDS = 16
+ROWS = 4
+SIGNATURE_SIZE = BANDS * ROWS
+# Сколько кандидатов из корзин проверять по подписи.
+MAX_CANDIDATES = 50
+# Короткие тексты вроде «Привет!» совпадают у разных людей честно,
+# их на дубликаты не проверяем.
+MIN_SHINGLES = 5
+
+_rng = random.Random(20201)
+# Порядок, в котором пустая ячейка ищет непустую: свой для каждой ячейки
+# и один для всех текстов.
+PROBES = [
+    _rng.sample(range(SIGNATURE_SIZE), SIGNATURE_SIZE)
+    for _ in range(SIGNATURE_SIZE)
+]
+
+
+def stable_hash(data, size=8):
+    return int.from_bytes(
+        hashlib.blake2b(data, digest_size=size).digest(), 'big')
+
+
+def shingles(text):
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return set(map(' '.join, zip(*(
+        words[start:] for start in range(SHINGLE_SIZE)))))
+
+
+def minhash(text_shingles):
+    """Bottom-k подпись множества шинглов; None для пустого множества."""
+    if not text_shingles:
+        return None
+    return tuple(sorted(set(map(
+        zlib.crc32, map(str.encode, text_shingles))))[:SIGNATURE_SIZE])
+
+
+def cells(signature):
+    """Подпись, разложенная по SIGNATURE_SIZE ячейкам для полос LSH."""
+    filled = {}
+    # По убыванию: в ячейке остаётся последний, то есть наименьший хеш.
+    for value in reversed(signature):
+        filled[value % SIGNATURE_SIZE] = value
+    return [
+        filled[cell] if cell in filled else filled[next(
+            source for source in PROBES[cell] if source in filled)]
+        for cell in range(SIGNATURE_SIZE)
+    ]
+
+
+def signature(text, min_shingles=1):
+    """MinHash-подпись текста; None, если шинглов меньше min_shingles."""
+    text_shingles = shingles(text)
+    if len(text_shingles) < max(min_shingles, 1):
+        return None
+    return minhash(text_shingles)
+
+
+def post_signature(post, text=None, min_shingles=1):
+    """Подпись текста поста, посчитанная для объекта один раз.
+
+    Форма проверяет текст на дубликаты, а сигнал post_save индексирует
+    тот же текст: подпись хранится на объекте вместе с текстом, по
+    которому она посчитана, и числом его шинглов.
+    """
+    text = post.text if text is None else text
+    cached = getattr(post, '_signature', None)
+    if cached is None or cached[0] != text:
+        text_shingles = shingles(text)
+        cached = (text, len(text_shingles), minhash(text_shingles))
+        post._signature = cached
+    _, count, text_signature = cached
+    return text_signature if count >= min_shingles else None
+
+
+def buckets(signature):
+    """Хеши полос подписи как знаковые 64-битные числа для BigIntegerField."""
+    signature_cells = cells(signature)
+    result = []
+    for band in range(BANDS):
+        rows = signature_cells[band * ROWS:(band + 1) * ROWS]
+        packed = struct.pack(f'>H{ROWS}Q', band, *rows)
+        result.append(stable_hash(packed) - (1 << 63))
+    return result
+
+
+def pack(signature):
+    return struct.pack(f'>{len(signature)}I', *signature)
+
+
+def unpack(data):
+    return struct.unpack(f'>{len(data) // 4}I', bytes(data))
+
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по двум подписям."""
+    first, second = set(first), set(second)
+    union = sorted(first | second)[:SIGNATURE_SIZE]
+    return sum(
+        value in first and value in second for value in union) / len(union)
+
+
+def find_similar(text, threshold, exclude=None, post=None):
+    """Посты, чей текст похож на text не меньше threshold.
+
+    Возвращает список пар (id поста, сходство). Подпись текста
+    запоминается на post, чтобы сигнал post_save не считал её заново.
+    Кандидаты берутся по числу совпавших корзин: чем их больше, тем
+    ближе подписи.
+    """
+    if post is None:
+        text_signature = signature(text, MIN_SHINGLES)
+    else:
+        text_signature = post_signature(post, text, MIN_SHINGLES)
+    if text_signature is None:
+        return []
+    candidates = PostBand.objects.filter(
+        bucket__in=buckets(text_signature))
+    if exclude is not None:
+        candidates = candidates.exclude(post_id=exclude)
+    candidate_ids = list(candidates.values('post_id').annotate(
+        matches=Count('bucket')).order_by(
+        '-matches', 'post_id').values_list(
+        'post_id', flat=True)[:MAX_CANDIDATES])
+    if not candidate_ids:
+        return []
+    found = []
+    for post_id, data in PostSignature.objects.filter(
+            post_id__in=candidate_ids).values_list('post_id', 'signature'):
+        score = similarity(text_signature, unpack(data))
+        if score >= threshold:
+            found.append((post_id, score))
+    return found
+
+
+def index_post(post, created=False):
+    """Пересчитывает подпись и корзины поста."""
+    text_signature = post_signature(post)
+    with transaction.atomic(savepoint=False):
+        if not created:
+            PostBand.objects.filter(post=post).delete()
+            PostSignature.objects.filter(post=post).delete()
+        if text_signature is None:
+            return
+        PostSignature.objects.create(
+            post=post, signature=pack(text_signature))
+        PostBand.objects.bulk_create(
+            PostBand(post=post, bucket=bucket)
+            for bucket in buckets(text_signature))
+
+
+def index_rows(rows):
+    """Строки подписей и корзин для пар (id, текст) без записи в базу."""
+    signatures, bands = [], []
+    for post_id, text in rows:
+        text_signature = signature(text)
+        if text_signature is None:
+            continue
+        signatures.append(PostSignature(
+            post_id=post_id, signature=pack(text_signature)))
+        bands.extend(
+            PostBand(post_id=post_id, bucket=bucket)
+            for bucket in buckets(text_signature))
+    return signatures, bands
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .excerpts import RENDERED_FIELDS, TITLE_LENGTH, rendered
+
 User = get_user_model()
 
 
@@ -25,8 +27,34 @@ class Group(models.Model):
         return self.title
 
 
+# Колонки, которые показывает карточка поста в лентах
+# (templates/posts/includes/posts.html).
+CARD_FIELDS = (
+    'excerpt_html', 'truncated', 'pub_date', 'image',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__title', 'group__slug',
+)
+
+
+def card_fields(relation):
+    """CARD_FIELDS поста, до которого ведёт связь relation."""
+    return [f'{relation}__{field}' for field in CARD_FIELDS]
+
+
+class PostQuerySet(models.QuerySet):
+    def cards(self):
+        """Посты для лент: только колонки карточки, без полного текста."""
+        return self.select_related('author', 'group').only(*CARD_FIELDS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for post in objs:
+            post.render_text()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Post(models.Model):
-    POST_LEN = 15
+    POST_LEN = TITLE_LENGTH
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Напишите текст поста',)
@@ -51,15 +79,43 @@ class Post(models.Model):
         blank=True,
         help_text='Загрузите картинку',
     )
+    title = models.CharField(
+        'Заголовок', max_length=TITLE_LENGTH, blank=True, editable=False)
+    excerpt = models.TextField('Анонс', blank=True, editable=False)
+    excerpt_html = models.TextField(
+        'HTML анонса', blank=True, editable=False)
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    truncated = models.BooleanField(
+        'Анонс короче текста', default=False, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date', )
+        # Ленты листаются курсором по (pub_date, id).
+        indexes = (
+            models.Index(fields=('-pub_date', '-id')),
+            models.Index(fields=('group', '-pub_date', '-id')),
+            models.Index(fields=('author', '-pub_date', '-id')),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:self.POST_LEN]
 
+    def render_text(self):
+        """Пересчитывает анонс и HTML по текущему тексту."""
+        for field, value in rendered(self.text).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -81,6 +137,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created', )
+        indexes = (models.Index(fields=('post', '-created', '-id')),)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -103,5 +160,339 @@ class Follow (models.Model):
     )
 
     class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class FollowCounts(models.Model):
+    """Число подписчиков и подписок пользователя.
+
+    Строку правят в одной транзакции с самой подпиской, поэтому профилю
+    не нужен COUNT по таблице подписок.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_counts',
+        verbose_name='Пользователь',
+    )
+    followers = models.IntegerField('Подписчиков', default=0)
+    following = models.IntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики подписок'
+        verbose_name_plural = 'Счётчики подписок'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.followers} / {self.following}'
+
+
+class GroupStats(models.Model):
+    """Сводка по группе для каталога групп.
+
+    Строка обновляется сигналами при создании, удалении и переносе
+    постов, поэтому каталогу не нужны COUNT и MAX по постам.
+    """
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа',
+    )
+    post_count = models.PositiveIntegerField('Число постов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последний пост', null=True, blank=True)
+    recent_authors = models.CharField(
+        'Недавние авторы',
+        max_length=800,
+        blank=True,
+        help_text='Имена пользователей через пробел, новые первыми',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return f'{self.group_id}: {self.post_count}'
+
+    @property
+    def authors(self):
+        return self.recent_authors.split()
+
+
+class PostScore(models.Model):
+    """Рейтинг поста в ленте популярного.
+
+    score хранит логарифм суммы весов событий (комментариев и
+    просмотров), каждый из которых умножен на растущую со временем
+    экспоненту. Так затухание старых событий не требует пересчёта:
+    достаточно сравнивать score, а новое событие меняет одну строку.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Рейтинг', db_index=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
+
+
+class PostViews(models.Model):
+    """Число просмотров поста.
+
+    Пишется пачками из буфера воркера (posts.counters), поэтому отстаёт
+    от настоящего числа на время между сбросами.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='views',
+        verbose_name='Пост',
+    )
+    total = models.PositiveIntegerField('Просмотры', default=0)
+
+    class Meta:
+        verbose_name = 'Просмотры поста'
+        verbose_name_plural = 'Просмотры постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.total}'
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_like'),
+        )
+        verbose_name = 'Лайк'
+        verbose_name_plural = 'Лайки'
+
+    def __str__(self):
+        return f'{self.user_id} → {self.post_id}'
+
+
+class LikeCounter(models.Model):
+    """Доля счётчика лайков поста.
+
+    Лайк прибавляется к случайной из LIKE_COUNTER_SHARDS строк поста,
+    поэтому одновременные лайки горячего поста не ждут блокировку одной
+    строки. Число лайков — сумма по строкам поста.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_counters',
+        verbose_name='Пост',
+    )
+    shard = models.PositiveSmallIntegerField('Номер доли')
+    total = models.IntegerField('Лайки', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('post', 'shard'), name='unique_like_counter_shard'),
+        )
+        verbose_name = 'Счётчик лайков'
+        verbose_name_plural = 'Счётчики лайков'
+
+    def __str__(self):
+        return f'{self.post_id}/{self.shard}: {self.total}'
+
+
+class Tag(models.Model):
+    name = models.CharField('Хештег', max_length=50, unique=True)
+
+    class Meta:
+        verbose_name = 'Хештег'
+        verbose_name_plural = 'Хештеги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class TaggedPost(models.Model):
+    """Запись обратного индекса хештег → пост.
+
+    Дата поста скопирована сюда, чтобы лента хештега читалась одним
+    проходом по индексу (tag, -pub_date, -id) без соединения с постами
+    для сортировки.
+    """
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='tagged_posts',
+        verbose_name='Хештег',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tagged',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('tag', 'post'), name='unique_tagged_post'),
+        )
+        indexes = (models.Index(fields=('tag', '-pub_date', '-id')),)
+        verbose_name = 'Пост с хештегом'
+        verbose_name_plural = 'Посты с хештегами'
+
+    def __str__(self):
+        return f'{self.tag_id} → {self.post_id}'
+
+
+class PostSignature(models.Model):
+    """MinHash-подпись текста поста для поиска почти одинаковых постов."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Пост',
+    )
+    signature = models.BinaryField('Подпись')
+
+    class Meta:
+        verbose_name = 'Подпись поста'
+        verbose_name_plural = 'Подписи постов'
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class PostBand(models.Model):
+    """Корзина LSH: хеш одной полосы MinHash-подписи поста.
+
+    Посты с совпавшей корзиной хотя бы в одной полосе — кандидаты в
+    дубликаты; номер полосы подмешан в хеш, поэтому хватает индекса по
+    одному столбцу.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='bands',
+        verbose_name='Пост',
+    )
+    bucket = models.BigIntegerField('Корзина', db_index=True)
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.bucket}'
+
+
+class GroupSubscription(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_subscriptions',
+        verbose_name='Подписчик',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='subscribers',
+        verbose_name='Группа',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'group'), name='unique_group_subscription'),
+        )
+        verbose_name = 'Подписка на группу'
+        verbose_name_plural = 'Подписки на группы'
+
+    def __str__(self):
+        return f'{self.user_id} → {self.group_id}'
+
+
+class FollowSuggestion(models.Model):
+    """Готовая рекомендация «кого почитать» (manage.py build_suggestions)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ('user', 'rank')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'rank'), name='unique_suggestion_rank'),
+        )
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+
+    def __str__(self):
+        return f'{self.user_id} → {self.author_id}'
+
+
+class StaleSuggestions(models.Model):
+    """Пользователь, чьи подписки изменились после расчёта рекомендаций.
+
+    Без внешнего ключа: при удалении пользователя его подписки удаляются
+    каскадом и снова отмечают его здесь, а такие строки просто
+    пропускает build_suggestions.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    changed = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
+
+    def __str__(self):
+        return str(self.user_id)
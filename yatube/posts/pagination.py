@@ -0,0 +1,100 @@
+"""Курсорная (keyset) пагинация лент.
+
+Вместо OFFSET следующая страница начинается строго после последней
+показанной записи в порядке (-дата, -id), поэтому глубокие страницы
+стоят столько же, сколько первая, а курсор не «съезжает» при появлении
+новых постов.
+"""
+import base64
+import json
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment, pk):
+    raw = json.dumps([moment.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        moment, pk = json.loads(raw)
+        moment = parse_datetime(moment)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if moment is None or not isinstance(pk, int):
+        raise InvalidCursor(cursor)
+    return moment, pk
+
+
+def value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def after_cursor(queryset, cursor, date_field='pub_date'):
+    """Строки queryset в порядке (-дата, -id) строго после cursor."""
+    queryset = queryset.order_by(f'-{date_field}', '-id')
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': moment})
+            | Q(**{date_field: moment, 'id__lt': pk}))
+    return queryset
+
+
+def cut_page(rows, size, date_field):
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor(value(last, date_field), value(last, 'id'))
+
+
+def keyset_page(queryset, cursor, size, date_field='pub_date'):
+    """Не больше size строк после cursor и курсор следующей страницы."""
+    rows = list(after_cursor(queryset, cursor, date_field)[:size + 1])
+    return cut_page(rows, size, date_field)
+
+
+def merged_keyset_page(queryset, streams, cursor, size,
+                       date_field='pub_date'):
+    """Страница слияния лент-источников в общем порядке (-дата, -id).
+
+    streams — фильтры источников вроде {'author_id': 5}. Каждый источник
+    отдаёт не больше size + 1 строк после курсора своим подзапросом с
+    LIMIT, который идёт по индексу (источник, -дата, -id); подзапросы
+    сливаются одним UNION с общей сортировкой, а строки страницы
+    дочитываются из queryset по id. Читается не больше
+    len(streams) * (size + 1) строк индекса, сколько бы постов ни было у
+    источников и сколько бы чужих постов ни вышло за то же время.
+    """
+    if not streams:
+        return [], None
+    quote = connection.ops.quote_name
+    heads, params = [], []
+    for number, lookups in enumerate(streams):
+        head = after_cursor(
+            queryset.model._base_manager.filter(**lookups), cursor,
+            date_field).values_list('id', date_field)[:size + 1]
+        sql, head_params = head.query.sql_with_params()
+        heads.append(f'SELECT * FROM ({sql}) AS head{number}')
+        params.extend(head_params)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(
+            f'SELECT {quote("id")} FROM ({" UNION ".join(heads)}) AS heads '
+            f'ORDER BY {quote(date_field)} DESC, {quote("id")} DESC '
+            f'LIMIT %s',
+            [*params, size + 1])
+        ids = [row[0] for row in db_cursor.fetchall()]
+    rows = {
+        value(row, 'id'): row
+        for row in queryset.filter(id__in=ids).order_by()}
+    return cut_page(
+        [rows[pk] for pk in ids if pk in rows], size, date_field)
@@ -0,0 +1,89 @@
+"""Метки самого нового поста для дешёвого опроса лент.
+
+Для общей ленты, каждого автора и каждой группы в кеше лежит id
+последнего поста.
+Клиент присылает id самого нового поста, который он уже видел, и пока
+метка не больше него, ответ собирается без обращения к базе.
+
+Метка только растёт: сравнение и запись идут под блокировкой cache.add,
+иначе автор поста 10, прочитавший метку до записи поста 11, вернул бы
+её назад и клиенты не узнали бы о посте 11. Не дождавшись блокировки,
+процесс сбрасывает метку, и следующее чтение берёт её из базы.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import Post
+
+FEED_KEY = 'feed:latest'
+LOCK_TIMEOUT = 1
+WAIT_STEP = 0.005
+WAIT_STEPS = 20
+
+
+def latest_key(field=None, value=None):
+    if field is None:
+        return FEED_KEY
+    return f'{FEED_KEY}:{field}:{value}'
+
+
+def remember_post(post):
+    """Сдвигает метки общей ленты, автора и группы на новый пост."""
+    keys = [latest_key(), latest_key('author', post.author_id)]
+    if post.group_id is not None:
+        keys.append(latest_key('group', post.group_id))
+    for key in keys:
+        raise_mark(key, post.pk)
+
+
+def raise_mark(key, post_id):
+    """Поднимает метку key до post_id; вниз метка не двигается."""
+    lock = f'{key}:lock'
+    for _ in range(WAIT_STEPS):
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                if (cache.get(key) or 0) < post_id:
+                    cache.set(key, post_id, None)
+            finally:
+                cache.delete(lock)
+            return
+        time.sleep(WAIT_STEP)
+    cache.delete(key)
+
+
+def latest_post_id():
+    """id самого нового поста; при пустом кеше метка читается из базы."""
+    latest = cache.get(latest_key())
+    if latest is None:
+        latest = Post.objects.aggregate(latest=Max('id'))['latest'] or 0
+        cache.set(latest_key(), latest, None)
+    return latest
+
+
+def latest_marks(field, ids):
+    """Метки по значениям поля field ('author' или 'group')."""
+    keys = {latest_key(field, value): value for value in ids}
+    marks = cache.get_many(keys)
+    missing = [keys[key] for key in keys if key not in marks]
+    if missing:
+        found = dict(Post.objects.filter(**{
+            f'{field}_id__in': missing
+        }).values(f'{field}_id').annotate(latest=Max('id')).values_list(
+            f'{field}_id', 'latest'))
+        fresh = {
+            latest_key(field, value): found.get(value, 0)
+            for value in missing
+        }
+        cache.set_many(fresh, None)
+        marks.update(fresh)
+    return marks.values()
+
+
+def latest_post_id_of(author_ids, group_ids=()):
+    """id самого нового поста указанных авторов и групп."""
+    return max(
+        (*latest_marks('author', author_ids),
+         *latest_marks('group', group_ids)),
+        default=0)
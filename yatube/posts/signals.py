@@ -0,0 +1,184 @@
+from django.db.models import Q
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .following import drop_following, drop_subscriptions, shift_counts
+from .minhash import index_post
+from .models import (Comment, Follow, FollowCounts, Group, GroupStats,
+                     GroupSubscription, Post, User)
+from .polling import remember_post
+from .snapshots import delete_snapshot, delete_snapshots
+from .stats import post_added, shift
+from .suggestions import mark_stale
+from .tags import sync_tags
+from .trending import COMMENT_WEIGHT, bump
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_post_snapshot(sender, instance, **kwargs):
+    """Правка или удаление поста делает его статическую копию неверной."""
+    delete_snapshot(instance.pk)
+
+
+# Поля групп и пользователей, которые видны на копиях страниц постов.
+SNAPSHOT_FIELDS = {
+    Group: ('title', 'slug'),
+    User: ('username', 'first_name', 'last_name'),
+}
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_snapshot_fields(sender, instance, update_fields=None,
+                             **kwargs):
+    """Запоминает видные на копиях поля до правки.
+
+    Сохранения, не трогающие эти поля (например, last_login при входе),
+    обходятся без запроса.
+    """
+    fields = SNAPSHOT_FIELDS[sender]
+    instance._snapshot_fields = None
+    if instance.pk is None or (
+            update_fields is not None and not set(fields) & update_fields):
+        return
+    instance._snapshot_fields = sender.objects.filter(
+        pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def drop_renamed_snapshots(sender, instance, created, **kwargs):
+    """Сбрасывает копии страниц, где показана переименованная запись.
+
+    Для группы это её посты, для пользователя — его посты и посты с его
+    комментариями.
+    """
+    previous = getattr(instance, '_snapshot_fields', None)
+    current = tuple(
+        getattr(instance, field) for field in SNAPSHOT_FIELDS[sender])
+    if created or previous is None or previous == current:
+        return
+    if sender is Group:
+        posts = Post.objects.filter(group=instance)
+    else:
+        posts = Post.objects.filter(
+            Q(author=instance) | Q(comments__author=instance)).distinct()
+    delete_snapshots(posts)
+
+
+@receiver(pre_delete, sender=Group)
+def drop_group_snapshots(sender, instance, **kwargs):
+    """Сбрасывает копии постов удаляемой группы.
+
+    SET_NULL обнуляет group_id без сигналов постов, и копии остались бы
+    со ссылкой на несуществующую группу.
+    """
+    delete_snapshots(Post.objects.filter(group=instance))
+
+
+@receiver(post_save, sender=Post)
+def move_latest_post_mark(sender, instance, created, **kwargs):
+    if created:
+        remember_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def drop_commented_post_snapshot(sender, instance, **kwargs):
+    delete_snapshot(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает группу и текст поста до правки."""
+    if instance.pk is not None:
+        instance._previous_group_id, instance._previous_text = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'text').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    if created:
+        if instance.group_id is not None:
+            post_added(instance)
+        return
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous == instance.group_id:
+        return
+    if previous is not None:
+        shift(previous, -1)
+    if instance.group_id is not None:
+        shift(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        shift(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def score_commented_post(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.post_id, COMMENT_WEIGHT, instance.created)
+
+
+@receiver(post_save, sender=Post)
+def index_post_tags(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        sync_tags(instance, created)
+
+
+@receiver(post_save, sender=Post)
+def index_post_signature(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_text', None)
+    if created or previous != instance.text:
+        index_post(instance, created)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def mark_suggestions_stale(sender, instance, **kwargs):
+    """Рекомендации подписчика пересчитает build_suggestions."""
+    mark_stale(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def drop_cached_following(sender, instance, **kwargs):
+    drop_following(instance.user_id)
+
+
+@receiver(post_save, sender=GroupSubscription)
+@receiver(post_delete, sender=GroupSubscription)
+def drop_cached_subscriptions(sender, instance, **kwargs):
+    drop_subscriptions(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_follow_counts(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        FollowCounts.objects.bulk_create(
+            [FollowCounts(user=instance)], ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        shift_counts(instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    shift_counts(instance.user_id, instance.author_id, -1)
@@ -0,0 +1,76 @@
+"""Статические копии страниц старых постов.
+
+Страница поста, у которого давно не было активности, сохраняется как
+обычный HTML-файл, и nginx отдаёт её через try_files, не заходя в
+gunicorn и базу. Персональные части страницы остаются SSI-вставками,
+поэтому копия годится и для гостей, и для вошедших пользователей.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Post
+
+
+def snapshot_path(post_id):
+    return os.path.join(
+        settings.SNAPSHOT_ROOT, 'posts', str(post_id), 'index.html')
+
+
+def cold_posts(now=None):
+    """Посты без новых комментариев за SNAPSHOT_COLD_DAYS дней."""
+    cutoff = (now or timezone.now()) - timedelta(
+        days=settings.SNAPSHOT_COLD_DAYS)
+    return Post.objects.filter(pub_date__lt=cutoff).exclude(
+        comments__created__gte=cutoff)
+
+
+def render_snapshot(post_id):
+    """HTML страницы поста, каким его видит гость.
+
+    Копию отдаёт nginx, поэтому персональные фрагменты и счётчик
+    просмотров в ней всегда SSI-вставки, а сборка копии не считается
+    просмотром.
+    """
+    from .caches import post_cache
+    from .views import post_page
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse(
+        'posts:post_detail', args=(post_id,))
+    request.META = {'SERVER_NAME': 'localhost', 'SERVER_PORT': '80'}
+    request.user = AnonymousUser()
+    response = post_page(
+        request, post_cache.get_or_404(pk=post_id), ssi_fragments=True)
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def write_snapshot(post_id):
+    path = snapshot_path(post_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # nginx не должен увидеть наполовину записанный файл.
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(render_snapshot(post_id))
+    os.replace(temporary, path)
+
+
+def delete_snapshot(post_id):
+    try:
+        os.remove(snapshot_path(post_id))
+    except FileNotFoundError:
+        pass
+
+
+def delete_snapshots(posts):
+    """Удаляет копии постов из queryset posts."""
+    for post_id in posts.values_list('pk', flat=True).iterator():
+        delete_snapshot(post_id)
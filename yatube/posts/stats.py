@@ -0,0 +1,72 @@
+"""Поддержка таблицы GroupStats.
+
+Создание, удаление и перенос поста в другую группу меняют строку одним
+UPDATE: счётчик через F(), дату последнего поста новый пост поднимает
+через Greatest, а недавних авторов все три пересчитывают по индексу
+(group, -pub_date, -id) одним запросом с LIMIT. Строка не читается и
+не пишется целиком, поэтому параллельные посты не затирают друг друга.
+"""
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Group, GroupStats, Post
+
+RECENT_AUTHORS = 5
+# Сколько последних постов группы просматривать в поиске недавних авторов.
+RECENT_SCAN = 50
+
+
+def recent_activity(group_id):
+    """Дата последнего поста и недавние авторы группы."""
+    rows = list(Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date', '-id').values_list(
+        'pub_date', 'author__username')[:RECENT_SCAN])
+    authors = []
+    for _, username in rows:
+        if username not in authors:
+            authors.append(username)
+        if len(authors) == RECENT_AUTHORS:
+            break
+    return (rows[0][0] if rows else None), ' '.join(authors)
+
+
+def rebuild_group_stats():
+    """Пересчитывает статистику всех групп с нуля."""
+    stats = []
+    for group_id, count, latest in Group.objects.annotate(
+        count=Count('posts'), latest=Max('posts__pub_date')
+    ).values_list('id', 'count', 'latest').iterator():
+        stats.append(GroupStats(
+            group_id=group_id, post_count=count, last_post_at=latest,
+            recent_authors=recent_activity(group_id)[1] if count else ''))
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
+
+
+def post_added(post):
+    """Учитывает новый пост группы без пересчёта."""
+    _, authors = recent_activity(post.group_id)
+    pub_date = Value(post.pub_date, output_field=models.DateTimeField())
+    updated = GroupStats.objects.filter(group_id=post.group_id).update(
+        post_count=F('post_count') + 1,
+        # В SQLite MAX с NULL даёт NULL, поэтому пустая дата заменяется.
+        last_post_at=Greatest(Coalesce('last_post_at', pub_date), pub_date),
+        recent_authors=authors)
+    if not updated:
+        shift(post.group_id, 0)
+
+
+def shift(group_id, delta):
+    """Сдвигает счётчик группы на delta и обновляет недавнюю активность."""
+    latest, authors = recent_activity(group_id)
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + delta, last_post_at=latest,
+        recent_authors=authors)
+    if not updated:
+        GroupStats.objects.create(
+            group_id=group_id,
+            post_count=Post.objects.filter(group_id=group_id).count(),
+            last_post_at=latest, recent_authors=authors)
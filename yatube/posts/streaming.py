@@ -0,0 +1,38 @@
+from django.http import StreamingHttpResponse
+from django.template import RequestContext
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+STREAM_MARKER = '<!--yatube:stream-->'
+
+
+def stream_render(request, template_name, context, items, item_template,
+                  item_name, separator='', footer=None):
+    """Отдаёт страницу потоком.
+
+    Страница рендерится без списка: вместо него шаблон выводит
+    {{ streaming }}. Всё до этой метки уходит клиенту сразу, затем по одной
+    карточке на каждый элемент items по мере чтения из базы, затем хвост.
+    footer получает последний элемент (или None) и возвращает HTML,
+    который встаёт сразу после карточек.
+    """
+    page = get_template(template_name).render(
+        dict(context, streaming=mark_safe(STREAM_MARKER)), request)
+    head, _, tail = page.partition(STREAM_MARKER)
+    card = get_template(item_template).template
+
+    def chunks():
+        yield head
+        card_context = RequestContext(request, context)
+        item = None
+        with card_context.bind_template(card):
+            for number, item in enumerate(items):
+                if number:
+                    yield separator
+                with card_context.push({item_name: item}):
+                    yield card.render(card_context)
+        if footer is not None:
+            yield footer(item)
+        yield tail
+
+    return StreamingHttpResponse(chunks())
@@ -0,0 +1,62 @@
+"""Хештеги в тексте постов и их обратный индекс TaggedPost."""
+from django.db import transaction
+
+from .excerpts import HASHTAG
+from .models import Post, Tag, TaggedPost
+
+
+def parse_tags(text):
+    return {name.lower() for name in HASHTAG.findall(text)}
+
+
+def tag_ids(names):
+    """id хештегов с именами names; недостающие создаются."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in sorted(names)], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_tags(post, created=False):
+    """Приводит записи индекса поста в соответствие с его текстом.
+
+    Меняются только добавленные и удалённые хештеги.
+    """
+    names = parse_tags(post.text)
+    current = {} if created else dict(TaggedPost.objects.filter(
+        post=post).values_list('tag__name', 'id'))
+    added = names - set(current)
+    removed = [current[name] for name in set(current) - names]
+    with transaction.atomic(savepoint=False):
+        if removed:
+            TaggedPost.objects.filter(id__in=removed).delete()
+        if added:
+            TaggedPost.objects.bulk_create([
+                TaggedPost(tag_id=tag_id, post=post, pub_date=post.pub_date)
+                for tag_id in tag_ids(added).values()
+            ], ignore_conflicts=True)
+
+
+def rebuild_tags(batch_size=2000):
+    """Строит индекс хештегов по всем постам заново, читая их пачками."""
+    TaggedPost.objects.all().delete()
+    total = 0
+    last_id = 0
+    posts = Post.objects.order_by('id').values_list('id', 'text', 'pub_date')
+    while True:
+        chunk = list(posts.filter(id__gt=last_id)[:batch_size])
+        if not chunk:
+            return total
+        last_id = chunk[-1][0]
+        parsed = [
+            (post_id, pub_date, parse_tags(text))
+            for post_id, text, pub_date in chunk
+        ]
+        ids = tag_ids(set().union(*(names for _, _, names in parsed)))
+        rows = [
+            TaggedPost(tag_id=ids[name], post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date, names in parsed for name in names
+        ]
+        TaggedPost.objects.bulk_create(rows, batch_size=batch_size)
+        total += len(rows)
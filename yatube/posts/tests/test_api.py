@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        moment = timezone.now()
+        Post.objects.bulk_create([
+            Post(text=f'Пост номер {number}', author=cls.author,
+                 group=cls.group if number % 2 else None,
+                 pub_date=moment - timedelta(minutes=number // 3))
+            for number in range(25)
+        ])
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(text=f'Комментарий {number}', author=cls.reader,
+                    post=cls.post)
+            for number in range(3)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def walk(self, url):
+        """Все записи ленты, пройденной по ссылкам next."""
+        results = []
+        while url:
+            data = self.guest_client.get(url).json()
+            results.extend(data['results'])
+            url = data['next']
+        return results
+
+    def test_cursor_walks_whole_feed_once(self):
+        """Курсор обходит ленту без пропусков и повторов."""
+        results = self.walk(reverse('api:index') + '?limit=4')
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        self.assertEqual([item['id'] for item in results], expected)
+
+    def test_feeds_filter_posts(self):
+        """Ленты группы, профиля и подписок отдают свои посты."""
+        group_ids = self.walk(
+            reverse('api:group_posts', args=(self.group.slug,)))
+        self.assertEqual(len(group_ids), self.group.posts.count())
+        self.assertEqual(len(self.walk(
+            reverse('api:profile', args=(self.author.username,)))), 25)
+        response = self.authorized_client.get(reverse('api:follow_index'))
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_sparse_fields(self):
+        """Параметр fields ограничивает набор полей."""
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,author'})
+        item = response.json()['results'][0]
+        self.assertEqual(item, {'id': item['id'], 'author': 'auth'})
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_requests(self):
+        """Неверный курсор и лимит дают 400, неизвестный объект — 404."""
+        for params in ({'cursor': 'мусор'}, {'limit': 'много'}):
+            with self.subTest(params=params):
+                response = self.guest_client.get(reverse('api:index'), params)
+                self.assertEqual(response.status_code, 400)
+        for url in (
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:post_comments', args=(0,)),
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:profile', args=('missing',)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code, 404)
+
+    def test_follow_feed_requires_login(self):
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_post_detail_and_comments(self):
+        response = self.guest_client.get(
+            reverse('api:post_detail', args=(self.post.pk,)))
+        self.assertEqual(response.json()['text'], self.post.text)
+        self.assertEqual(response.json()['image'], None)
+        response = self.guest_client.get(
+            reverse('api:post_comments', args=(self.post.pk,)))
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_etag_not_modified(self):
+        """Повтор с If-None-Match получает 304, после правки — 200."""
+        url = reverse('api:post_detail', args=(self.post.pk,))
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import view_counter
+from ..models import Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', seed=1, prefix='budget', users=40, groups=5,
+            posts=600, images=0, batch_size=200, stdout=StringIO())
+        cls.user = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows').first()
+        cls.author = User.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        cls.stranger = User.objects.exclude(
+            following__user=cls.user).exclude(pk=cls.user.pk).first()
+        cls.post = Post.objects.annotate(
+            total=Count('comments')).order_by('-total').first()
+        cls.own_post = cls.user.posts.first() or Post.objects.create(
+            author=cls.user, text='Собственный пост')
+        cls.group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+        # Сброс просмотров по таймеру не должен попасть в замер.
+        view_counter.flush()
+
+    def requests(self):
+        """Запросы к каждому представлению из файла бюджетов."""
+        latest = Post.objects.order_by('-id').values_list(
+            'id', flat=True).first()
+        return {
+            'index': (reverse('posts:index'), None, 'get'),
+            'group_list': (
+                reverse('posts:group_list', args=(self.group.slug,)),
+                None, 'get'),
+            'profile': (
+                reverse('posts:profile', args=(self.author.username,)),
+                None, 'get'),
+            'post_detail': (
+                reverse('posts:post_detail', args=(self.post.pk,)),
+                None, 'get'),
+            'follow_index': (reverse('posts:follow_index'), None, 'get'),
+            'create_post': (
+                reverse('posts:create_post'), {'text': 'Новый пост'}, 'post'),
+            'post_edit': (
+                reverse('posts:post_edit', args=(self.own_post.pk,)),
+                None, 'get'),
+            'add_comment': (
+                reverse('posts:add_comment', args=(self.post.pk,)),
+                {'text': 'Комментарий'}, 'post'),
+            'profile_follow': (
+                reverse('posts:profile_follow',
+                        args=(self.stranger.username,)),
+                None, 'post'),
+            'profile_unfollow': (
+                reverse('posts:profile_unfollow',
+                        args=(self.stranger.username,)),
+                None, 'post'),
+            'post_like': (
+                reverse('posts:post_like', args=(self.post.pk,)),
+                None, 'post'),
+            'api:index': (reverse('api:index'), None, 'get'),
+            'api:group_posts': (
+                reverse('api:group_posts', args=(self.group.slug,)),
+                None, 'get'),
+            'api:profile': (
+                reverse('api:profile', args=(self.author.username,)),
+                None, 'get'),
+            'api:follow_index': (reverse('api:follow_index'), None, 'get'),
+            'api:post_detail': (
+                reverse('api:post_detail', args=(self.post.pk,)),
+                None, 'get'),
+            'api:post_comments': (
+                reverse('api:post_comments', args=(self.post.pk,)),
+                None, 'get'),
+            'api:index_since': (
+                reverse('api:index_since'), {'after': latest}, 'get'),
+            'api:follow_since': (
+                reverse('api:follow_since'), {'after': latest}, 'get'),
+        }
+
+    def test_dataset_is_large_enough(self):
+        """Бюджеты проверяются на странице, полной постов и подписок."""
+        self.assertGreater(self.user.follower.count(), 1)
+        self.assertGreater(self.post.comments.count(), 1)
+        self.assertGreater(Follow.objects.filter(
+            user=self.user).values('author__posts').count(), 10)
+
+    def test_every_budget_is_checked(self):
+        self.assertEqual(set(self.budgets), set(self.requests()))
+
+    def test_views_within_budget(self):
+        for name, (url, data, method) in self.requests().items():
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(url_name=name, client=client):
+                    cache.clear()
+                    # Сессия и пользователь в кеше, как в рабочем режиме.
+                    client.get(reverse('about:author'))
+                    self.assertWithinBudget(
+                        name, client, url, data, method)
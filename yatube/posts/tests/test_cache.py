@@ -5,9 +5,10 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..counters import view_counter
 from ..models import Group, Post
 
 User = get_user_model()
@@ -76,3 +77,73 @@ class CacheViewsTest(TestCase):
             posts,
             'Не сбрасывается кэш.'
         )
+
+
+@override_settings(USE_SSI_FRAGMENTS=True)
+class SharedPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_index_is_shared_between_users(self):
+        """Главная одна на всех: персональное вынесено во фрагменты."""
+        first = self.author_client.get(reverse('posts:index'))
+        Post.objects.all().delete()
+        second = self.reader_client.get(reverse('posts:index'))
+        guest = Client().get(reverse('posts:index'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first.content, guest.content)
+        self.assertNotIn('Cookie', first.get('Vary', ''))
+        self.assertContains(
+            first, '<!--# include virtual="/fragments/user_nav/" -->')
+
+    def test_fragment_is_personal(self):
+        response = self.reader_client.get(
+            reverse('core:fragment', args=('user_nav',)))
+        self.assertContains(response, self.reader.username)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_actions_fragment(self):
+        """Фрагмент поста: форма комментария и правка только автору."""
+        url = reverse('core:fragment', args=('post_actions',))
+        params = {'post_id': self.post.pk, 'author': self.author.username}
+        edit_url = reverse('posts:post_edit', args=(self.post.pk,))
+        response = self.author_client.get(url, params)
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url, params)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = Client().get(url, params)
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    @override_settings(VIEW_FLUSH_INTERVAL=3600, VIEW_FLUSH_SIZE=1000)
+    def test_views_are_counted_by_fragment(self):
+        """За nginx просмотр считает фрагмент, а не страница поста."""
+        view_counter.flush()
+        Client().get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertFalse(view_counter.pending)
+        url = reverse('core:fragment', args=('post_views',))
+        Client().get(url, {'post_id': self.post.pk})
+        view_counter.flush()
+        response = Client().get(url, {'post_id': self.post.pk})
+        self.assertContains(response, 'Просмотров: <span>1</span>')
+        view_counter.flush()
+        response = Client().get(url, {'post_id': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_fragment(self):
+        response = self.reader_client.get(
+            reverse('core:fragment', args=('missing',)))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,174 @@
+import random
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.html import escape
+
+from ..excerpts import make_excerpt
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+WORDS = ('слово', 'пост', '#тег', 'очень-длинное-слово', 'а', '—', '\n')
+
+
+def random_text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randrange(120))) or 'пусто'
+
+
+class ExcerptTest(TestCase):
+    def test_excerpt_is_short_prefix_of_text(self):
+        """Для любых текстов анонс — начало текста по границе слова."""
+        rng = random.Random(1)
+        limit = settings.POST_EXCERPT_LENGTH
+        for _ in range(300):
+            text = random_text(rng)
+            excerpt = make_excerpt(text)
+            with self.subTest(text=text):
+                if len(text) <= limit:
+                    self.assertEqual(excerpt, text)
+                    continue
+                self.assertTrue(excerpt.endswith('…'))
+                body = excerpt[:-1]
+                self.assertLessEqual(len(body), limit)
+                self.assertTrue(text.startswith(body))
+                self.assertTrue(text[len(body):][:1].isspace()
+                                or text[len(body):][:1] in ',.;:—-')
+
+    def test_html_is_escaped_with_breaks_and_tag_links(self):
+        author = User.objects.create_user(username='auth')
+        post = Post.objects.create(
+            author=author, text='<b>жирный</b>\nстрока с #Тег')
+        self.assertIn('&lt;b&gt;', post.text_html)
+        self.assertIn('<br>', post.text_html)
+        self.assertIn(
+            f'<a href="{reverse("posts:tag", args=("тег",))}">#Тег</a>',
+            post.text_html)
+        self.assertFalse(post.truncated)
+        post.text = 'новый текст ' * 100
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertTrue(post.truncated)
+        self.assertEqual(post.excerpt_html, f'<p>{post.excerpt}</p>')
+
+    def test_rebuild_restores_rendered_columns(self):
+        author = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=author, text='Пост с #тег')
+        expected = Post.objects.values_list(
+            'excerpt', 'excerpt_html', 'text_html').get(pk=post.pk)
+        Post.objects.update(excerpt='', excerpt_html='', text_html='')
+        call_command('rebuild_excerpts', stdout=StringIO())
+        self.assertEqual(Post.objects.values_list(
+            'excerpt', 'excerpt_html', 'text_html').get(pk=post.pk), expected)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CardColumnsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = random.Random(7)
+        cls.reader = User.objects.create_user(username='reader')
+        authors = [
+            User.objects.create_user(
+                username=f'author_{number}', first_name=f'Имя {number}')
+            for number in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=rng.choice(authors), text=random_text(rng),
+                group=cls.group if rng.random() < 0.5 else None,
+                image=SimpleUploadedFile(
+                    f'{number}.gif', SMALL_GIF, content_type='image/gif')
+                if rng.random() < 0.3 else '')
+            for number in range(25)
+        ]
+        Post.objects.create(
+            author=authors[0], group=cls.group, text='Пост с #короткий')
+        Follow.objects.create(user=cls.reader, author=authors[0])
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        cls.author = authors[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_cards_never_load_deferred_fields(self):
+        """Карточки лент не дочитывают отложенные поля по одному."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:tag', args=('тег',)),
+            reverse('posts:index_more'),
+            reverse('posts:group_list_more', args=(self.group.slug,)),
+            reverse('posts:profile_more', args=(self.author.username,)),
+            reverse('posts:follow_index_more'),
+        )
+        deferred_load = AssertionError('отложенное поле читается отдельно')
+        for url in urls:
+            with self.subTest(url=url), mock.patch.object(
+                    Model, 'refresh_from_db', side_effect=deferred_load):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                b''.join(getattr(
+                    response, 'streaming_content', [response.content]))
+
+    def test_feed_shows_excerpt_not_full_text(self):
+        post = max(self.posts, key=lambda post: len(post.text))
+        self.assertTrue(post.truncated)
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=(post.author.username,)))
+        self.assertNotContains(response, post.text_html)
+        self.assertContains(response, post.excerpt_html)
+        self.assertContains(response, 'Читать дальше')
+
+    def test_short_post_has_no_read_more(self):
+        response = self.authorized_client.get(
+            reverse('posts:tag', args=('короткий',)))
+        self.assertContains(response, '#короткий</a>')
+        self.assertNotContains(response, 'Читать дальше')
+
+    def test_detail_title_is_stored(self):
+        """Заголовок страницы — сохранённое начало текста, как str(post)."""
+        post = max(self.posts, key=lambda post: len(post.text))
+        self.assertEqual(post.title, str(post))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, post.text_html)
+        title = response.content.decode().split('<title>')[1]
+        self.assertEqual(
+            title.split('</title>')[0].strip(),
+            f'Пост: {escape(post)}'.strip())
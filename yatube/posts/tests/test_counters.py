@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import ViewCounter, view_counter, view_total
+from ..models import Post, PostScore, PostViews
+
+User = get_user_model()
+
+
+@override_settings(VIEW_FLUSH_INTERVAL=3600, VIEW_FLUSH_SIZE=1000)
+class ViewCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Первый')
+        cls.other = Post.objects.create(author=cls.author, text='Второй')
+
+    def setUp(self):
+        view_counter.flush()
+        self.guest_client = Client()
+
+    def total(self, post):
+        return PostViews.objects.filter(post=post).values_list(
+            'total', flat=True).first()
+
+    def test_views_are_buffered_until_flush(self):
+        """Просмотры не пишутся в базу до сброса буфера."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        for _ in range(3):
+            self.guest_client.get(url)
+        self.assertIsNone(self.total(self.post))
+        view_counter.flush()
+        self.assertEqual(self.total(self.post), 3)
+        self.guest_client.get(url)
+        view_counter.flush()
+        self.assertEqual(self.total(self.post), 4)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Просмотров: <span>4</span>')
+
+    def test_total_is_read_by_primary_key(self):
+        """Число просмотров читается по ключу, без JOIN и сортировки."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(view_total(self.other.pk), 0)
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('ORDER BY', sql)
+
+    def test_flush_is_one_upsert(self):
+        """Сброс пишет просмотры и рейтинги по одному upsert на таблицу."""
+        counter = ViewCounter()
+        for post in (self.post, self.other, self.post):
+            counter.add(post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            counter.flush()
+        inserts = [
+            query['sql'] for query in queries.captured_queries
+            if 'posts_postviews' in query['sql']]
+        scores = [
+            query['sql'] for query in queries.captured_queries
+            if 'posts_postscore' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0])
+        self.assertEqual(len(scores), 1)
+        self.assertIn('ON CONFLICT', scores[0])
+        self.assertEqual(self.total(self.post), 2)
+        self.assertEqual(self.total(self.other), 1)
+        self.assertTrue(PostScore.objects.filter(post=self.post).exists())
+
+    def test_deleted_post_is_skipped(self):
+        counter = ViewCounter()
+        post = Post.objects.create(author=self.author, text='Удалённый')
+        counter.add(post.pk)
+        counter.add(self.post.pk)
+        post.delete()
+        counter.flush()
+        self.assertEqual(self.total(self.post), 1)
+
+    @override_settings(VIEW_FLUSH_SIZE=2)
+    def test_full_buffer_is_flushed(self):
+        counter = ViewCounter()
+        counter.add(self.post.pk)
+        self.assertIsNone(self.total(self.post))
+        counter.add(self.other.pk)
+        self.assertEqual(self.total(self.post), 1)
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..following import follow, followed_ids, following_key, is_following
+from ..models import Follow, FollowCounts
+
+User = get_user_model()
+
+
+class FollowingCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author_{number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_checks_are_answered_from_cache(self):
+        """После первой загрузки проверки подписки не ходят в базу."""
+        followed_ids(self.reader.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.reader, self.authors[1].id))
+            self.assertFalse(is_following(self.reader, self.authors[0].id))
+
+    def test_follow_drops_cached_array(self):
+        """Подписка сбрасывает массив, а не дописывает его на месте."""
+        followed_ids(self.reader.id)
+        follow(self.reader.id, self.authors[2].username)
+        self.assertIsNone(cache.get(following_key(self.reader.id)))
+        self.assertEqual(
+            list(followed_ids(self.reader.id)),
+            sorted([self.authors[1].id, self.authors[2].id]))
+
+    def test_follow_signals_drop_cached_set(self):
+        """Изменение подписок в обход views сбрасывает кеш."""
+        followed_ids(self.reader.id)
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertTrue(is_following(self.reader, self.authors[0].id))
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(is_following(self.reader, self.authors[1].id))
+
+    def test_profile_button_follows_views(self):
+        author = self.authors[2]
+        url = reverse('posts:profile', args=(author.username,))
+        self.assertFalse(self.authorized_client.get(url).context['following'])
+        self.authorized_client.post(
+            reverse('posts:profile_follow', args=(author.username,)))
+        self.assertTrue(self.authorized_client.get(url).context['following'])
+        self.authorized_client.post(
+            reverse('posts:profile_unfollow', args=(author.username,)))
+        self.assertFalse(self.authorized_client.get(url).context['following'])
+
+
+class FollowViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.follow_url = reverse(
+            'posts:profile_follow', args=(self.author.username,))
+        self.unfollow_url = reverse(
+            'posts:profile_unfollow', args=(self.author.username,))
+
+    def counts(self, user):
+        counts = FollowCounts.objects.get(user=user)
+        return counts.followers, counts.following
+
+    def test_follow_twice_counts_once(self):
+        """Повторная подписка не меняет ни строки, ни счётчики."""
+        for _ in range(2):
+            self.authorized_client.post(self.follow_url)
+        self.assertEqual(Follow.objects.filter(
+            user=self.reader, author=self.author).count(), 1)
+        self.assertEqual(self.counts(self.author), (1, 0))
+        self.assertEqual(self.counts(self.reader), (0, 1))
+        for _ in range(2):
+            self.authorized_client.post(self.unfollow_url)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.counts(self.author), (0, 0))
+        self.assertEqual(self.counts(self.reader), (0, 0))
+
+    def test_ajax_gets_json(self):
+        response = self.authorized_client.post(
+            self.follow_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'following': True})
+        response = self.authorized_client.post(
+            self.unfollow_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'following': False})
+
+    def test_prefetch_does_not_follow(self):
+        """Предзагрузка ссылки браузером не создаёт подписку."""
+        response = self.authorized_client.get(
+            self.follow_url, HTTP_SEC_PURPOSE='prefetch')
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unknown_author_is_404(self):
+        for name in ('profile_follow', 'profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.authorized_client.post(
+                    reverse(f'posts:{name}', args=('nobody',)))
+                self.assertEqual(response.status_code, 404)
+
+    def test_orm_changes_and_rebuild_keep_counts(self):
+        """Счётчики сходятся с подписками и после правок в обход views."""
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.assertEqual(self.counts(self.reader), (1, 0))
+        FollowCounts.objects.update(followers=7, following=7)
+        call_command('rebuild_follow_counts', stdout=StringIO())
+        self.assertEqual(self.counts(self.reader), (1, 0))
+        self.assertEqual(self.counts(self.author), (0, 1))
+        Follow.objects.all().delete()
+        self.assertEqual(self.counts(self.reader), (0, 0))
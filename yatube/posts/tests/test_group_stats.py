@@ -0,0 +1,117 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.second_group = Group.objects.create(
+            title='Вторая группа',
+            slug='second-slug',
+            description='Тестовое описание',
+        )
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def expected(self, group):
+        """Статистика группы, посчитанная напрямую по постам."""
+        posts = Post.objects.filter(group=group).order_by('-pub_date', '-id')
+        authors = []
+        for post in posts:
+            if post.author.username not in authors:
+                authors.append(post.author.username)
+        latest = posts.first()
+        return (posts.count(), latest and latest.pub_date, authors[:5])
+
+    def actual(self, group):
+        stats = self.stats(group)
+        return (stats.post_count, stats.last_post_at, stats.authors)
+
+    def test_new_group_has_empty_stats(self):
+        self.assertEqual(self.actual(self.group), (0, None, []))
+
+    def test_stats_follow_create_move_and_delete(self):
+        """Счётчики верны после создания, переноса и удаления постов."""
+        first = Post.objects.create(
+            author=self.author, text='Первый', group=self.group)
+        second = Post.objects.create(
+            author=self.other, text='Второй', group=self.group)
+        Post.objects.create(author=self.author, text='Третий',
+                            group=self.group)
+        self.assertEqual(self.actual(self.group), self.expected(self.group))
+        self.assertEqual(self.stats(self.group).authors, ['auth', 'other'])
+        second.group = self.second_group
+        second.save()
+        for group in (self.group, self.second_group):
+            with self.subTest(group=group.slug):
+                self.assertEqual(self.actual(group), self.expected(group))
+        first.delete()
+        second.delete()
+        for group in (self.group, self.second_group):
+            with self.subTest(group=group.slug):
+                self.assertEqual(self.actual(group), self.expected(group))
+
+    def test_new_post_is_one_update(self):
+        """Новый пост меняет строку одним UPDATE, не читая её."""
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.create(
+                author=self.author, text='Первый', group=self.group)
+        stats_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'posts_groupstats' in query['sql']]
+        self.assertEqual(len(stats_queries), 1)
+        self.assertTrue(stats_queries[0].startswith('UPDATE'))
+
+    def test_last_post_date_does_not_go_back(self):
+        """Пост, записанный позже более нового, дату не откатывает."""
+        newer = timezone.now() + timedelta(minutes=1)
+        GroupStats.objects.filter(group=self.group).update(
+            last_post_at=newer)
+        Post.objects.create(
+            author=self.other, text='Запоздавший', group=self.group)
+        self.assertEqual(self.stats(self.group).last_post_at, newer)
+
+    def test_rebuild_matches_incremental_stats(self):
+        for number in range(7):
+            Post.objects.create(
+                author=self.other if number % 3 else self.author,
+                text=f'Пост {number}', group=self.group)
+        incremental = self.actual(self.group)
+        GroupStats.objects.all().delete()
+        call_command('rebuild_group_stats', stdout=StringIO())
+        self.assertEqual(self.actual(self.group), incremental)
+
+    def test_directory_page_is_one_query(self):
+        """Каталог групп стоит одного запроса при любом числе постов."""
+        for number in range(5):
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=self.group)
+        client = Client()
+        with self.assertNumQueries(1):
+            response = client.get(reverse('posts:groups'))
+        stats_list = list(response.context['stats_list'])
+        self.assertEqual(
+            [stats.group for stats in stats_list],
+            [self.group, self.second_group])
+        self.assertContains(response, 'Записей: 5')
@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..likes import (attach_likes, bloom_key, like, liked_by, recent_count,
+                     recent_key, unlike)
+from ..models import Group, Like, LikeCounter, Post
+
+User = get_user_model()
+
+
+class LikeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def likes(self, post):
+        return sum(LikeCounter.objects.filter(
+            post=post).values_list('total', flat=True))
+
+    def test_like_is_idempotent(self):
+        """Повторный лайк не создаёт строку и не меняет счётчик."""
+        post = self.posts[0]
+        self.assertTrue(like(self.reader, post.pk))
+        self.assertFalse(like(self.reader, post.pk))
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(self.likes(post), 1)
+        self.assertTrue(unlike(self.reader, post.pk))
+        self.assertFalse(unlike(self.reader, post.pk))
+        self.assertEqual(self.likes(post), 0)
+
+    def test_counter_sums_shards(self):
+        post = self.posts[0]
+        for number in range(20):
+            user = User.objects.create_user(username=f'fan{number}')
+            like(user, post.pk)
+        self.assertGreater(LikeCounter.objects.filter(post=post).count(), 1)
+        self.assertEqual(attach_likes([post])[0].like_count, 20)
+
+    def test_filter_skips_query_without_likes(self):
+        """Пользователю без лайков на странице запрос лайков не нужен."""
+        post_ids = [post.pk for post in self.posts]
+        liked_by(self.reader, post_ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(liked_by(self.reader, post_ids), set())
+        like(self.reader, self.posts[1].pk)
+        # Лайк дописан в фильтр без перестройки по базе.
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                liked_by(self.reader, post_ids), {self.posts[1].pk})
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                liked_by(self.reader, post_ids), {self.posts[1].pk})
+
+    def test_filter_is_rebuilt_from_database(self):
+        like(self.reader, self.posts[2].pk)
+        cache.clear()
+        self.assertEqual(
+            liked_by(self.reader, [self.posts[2].pk]), {self.posts[2].pk})
+
+    def test_filter_built_before_like_is_not_used(self):
+        """Фильтр, собранный по базе до лайка, не прячет этот лайк."""
+        post = self.posts[3]
+        liked_by(self.reader, [post.pk])
+        stale = cache.get(bloom_key(self.reader.pk))
+        like(self.reader, post.pk)
+        liked_by(self.reader, [post.pk])
+        # Конкурент дописывает в кеш основу, прочитанную до лайка.
+        cache.set(bloom_key(self.reader.pk), stale)
+        self.assertEqual(liked_by(self.reader, [post.pk]), {post.pk})
+
+    def test_filter_is_rebuilt_when_recent_like_is_evicted(self):
+        post = self.posts[4]
+        liked_by(self.reader, [post.pk])
+        like(self.reader, post.pk)
+        cache.delete(recent_key(self.reader.pk, recent_count(self.reader.pk)))
+        with self.assertNumQueries(2):
+            self.assertEqual(liked_by(self.reader, [post.pk]), {post.pk})
+
+    def test_many_likes_grow_filter(self):
+        """Переполненная основа перестраивается с большим размером."""
+        liked_by(self.reader, [])
+        size = cache.get(bloom_key(self.reader.pk))[2][0]
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Ещё {number}')
+            for number in range(size // 16 + 1))
+        post_ids = list(Post.objects.filter(
+            text__startswith='Ещё').values_list('pk', flat=True))
+        for post_id in post_ids:
+            like(self.reader, post_id)
+        self.assertEqual(liked_by(self.reader, post_ids), set(post_ids))
+        self.assertGreater(cache.get(bloom_key(self.reader.pk))[2][0], size)
+
+    def test_feed_marks_liked_posts(self):
+        """Лента отмечает лайкнутые посты и показывает их число."""
+        like(self.reader, self.posts[3].pk)
+        response = self.authorized_client.get(
+            reverse('posts:group_list', args=(self.group.slug,)))
+        marks = {
+            post.pk: (post.liked, post.like_count)
+            for post in response.context['page_obj']
+        }
+        self.assertEqual(marks[self.posts[3].pk], (True, 1))
+        self.assertEqual(marks[self.posts[0].pk], (False, 0))
+        self.assertContains(
+            response, reverse('posts:post_unlike', args=(self.posts[3].pk,)))
+
+    def test_like_views(self):
+        url = reverse('posts:post_like', args=(self.posts[0].pk,))
+        self.assertEqual(self.authorized_client.get(url).status_code, 405)
+        response = self.authorized_client.post(
+            url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'liked': True, 'likes': 1})
+        response = self.authorized_client.post(
+            reverse('posts:post_unlike', args=(self.posts[0].pk,)),
+            HTTP_REFERER='http://evil.example/')
+        self.assertRedirects(
+            response,
+            reverse('posts:post_detail', args=(self.posts[0].pk,)),
+            fetch_redirect_response=False)
+        self.assertFalse(Like.objects.exists())
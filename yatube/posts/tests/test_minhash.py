@@ -0,0 +1,143 @@
+import timeit
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import minhash
+from ..forms import PostForm
+from ..minhash import buckets, find_similar, pack, signature, similarity
+from ..models import Post, PostBand, PostSignature
+
+User = get_user_model()
+
+SPAM = (
+    'Только сегодня! Лучшие часы со скидкой девяносто процентов, '
+    'переходите по ссылке и забирайте подарок номер {}'
+)
+
+
+@override_settings(DUPLICATE_POST_SIMILARITY=0.8, DUPLICATE_POST_LIMIT=3)
+class NearDuplicateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_signature_estimates_similarity(self):
+        """Похожие тексты дают близкие подписи, разные — далёкие."""
+        first = signature(SPAM.format(1))
+        self.assertGreater(similarity(first, signature(SPAM.format(2))), 0.8)
+        self.assertLess(similarity(first, signature(
+            'Совсем другой текст про прогулку в парке и осеннюю погоду')),
+            0.2)
+
+    def test_long_text_signature_is_fast(self):
+        """Подпись длинного текста считается меньше чем за миллисекунду."""
+        text = ' '.join(SPAM.format(number) for number in range(1000, 1040))
+        self.assertGreater(len(text), 4000)
+        runs = 20
+        best = min(timeit.repeat(
+            lambda: signature(text), number=runs, repeat=5)) / runs
+        self.assertLess(best, 0.001)
+        edited = text[:-20] + ' и ещё немного текста'
+        self.assertGreater(
+            similarity(signature(text), signature(edited)), 0.8)
+
+    def test_short_texts_similarity_is_exact(self):
+        """Для коротких текстов подпись хранит все шинглы."""
+        first, second = SPAM.format(1), SPAM.format(2)
+        first_shingles = minhash.shingles(first)
+        second_shingles = minhash.shingles(second)
+        self.assertEqual(
+            similarity(signature(first), signature(second)),
+            len(first_shingles & second_shingles)
+            / len(first_shingles | second_shingles))
+        self.assertEqual(
+            len(minhash.cells(signature(first))), minhash.SIGNATURE_SIZE)
+
+    def test_form_signs_text_once(self):
+        """Подпись из проверки формы переиспользует индексация поста."""
+        with mock.patch.object(
+                minhash, 'minhash', wraps=minhash.minhash) as counted:
+            self.authorized_client.post(
+                reverse('posts:create_post'), {'text': SPAM.format(1)})
+        self.assertEqual(counted.call_count, 1)
+        self.assertEqual(PostBand.objects.count(), 16)
+
+    def test_candidates_ordered_by_matching_bands(self):
+        """В MAX_CANDIDATES попадают посты с большим числом общих корзин."""
+        text_signature = signature(SPAM.format(1))
+        weak = Post.objects.create(author=self.author, text='Слабый')
+        strong = Post.objects.create(author=self.author, text='Сильный')
+        PostBand.objects.all().delete()
+        PostSignature.objects.all().delete()
+        PostSignature.objects.bulk_create([
+            PostSignature(post=weak, signature=pack(
+                signature('Совсем другой текст про прогулку в парке'))),
+            PostSignature(post=strong, signature=pack(text_signature)),
+        ])
+        bands = buckets(text_signature)
+        PostBand.objects.bulk_create(
+            [PostBand(post=weak, bucket=bands[0])]
+            + [PostBand(post=strong, bucket=bucket) for bucket in bands])
+        with mock.patch.object(minhash, 'MAX_CANDIDATES', 1):
+            found = find_similar(SPAM.format(1), 0.8)
+        self.assertEqual(found, [(strong.pk, 1.0)])
+
+    def test_index_follows_create_and_edit(self):
+        post = Post.objects.create(author=self.author, text=SPAM.format(1))
+        self.assertEqual(PostBand.objects.filter(post=post).count(), 16)
+        self.assertEqual(find_similar(SPAM.format(2), 0.8)[0][0], post.pk)
+        post.text = 'Исправленный текст без рекламы и ссылок, просто заметка'
+        post.save()
+        self.assertEqual(find_similar(SPAM.format(2), 0.8), [])
+        post.delete()
+        self.assertFalse(PostSignature.objects.exists())
+
+    def test_check_does_not_scan_posts(self):
+        """Проверка текста — два запроса к индексу, без чтения постов."""
+        for number in range(3):
+            Post.objects.create(author=self.author, text=SPAM.format(number))
+        with self.assertNumQueries(2) as queries:
+            self.assertEqual(len(find_similar(SPAM.format(9), 0.8)), 3)
+        self.assertFalse(any(
+            'posts_post"' in query['sql'].split('WHERE')[0]
+            for query in queries.captured_queries))
+
+    def test_form_rejects_repeated_spam(self):
+        """Форма пропускает пару похожих постов и отклоняет дальнейшие."""
+        url = reverse('posts:create_post')
+        for number in range(3):
+            self.authorized_client.post(url, {'text': SPAM.format(number)})
+        self.assertEqual(Post.objects.count(), 3)
+        response = self.authorized_client.post(
+            url, {'text': SPAM.format(3)})
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertFormError(
+            response, 'form', 'text',
+            'Почти такой же текст уже опубликован несколько раз.')
+
+    def test_editing_does_not_match_itself(self):
+        post = Post.objects.create(author=self.author, text=SPAM.format(1))
+        form = PostForm({'text': SPAM.format(1)}, instance=post)
+        with self.settings(DUPLICATE_POST_LIMIT=1):
+            self.assertTrue(form.is_valid())
+
+    def test_bulk_index_command(self):
+        """Команда индексирует посты без подписи, как и запись поста."""
+        post = Post.objects.create(author=self.author, text=SPAM.format(1))
+        expected = set(PostBand.objects.values_list('post_id', 'bucket'))
+        PostBand.objects.all().delete()
+        PostSignature.objects.all().delete()
+        call_command('index_signatures', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            set(PostBand.objects.values_list('post_id', 'bucket')), expected)
+        self.assertTrue(PostSignature.objects.filter(post=post).exists())
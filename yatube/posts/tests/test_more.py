@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..likes import like
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedMoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Пост номер {number}', author=cls.author,
+                 group=cls.group)
+            for number in range(23)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def scroll(self, client, url, cursor=None):
+        """Тексты всех постов, полученных порциями по курсору."""
+        texts = []
+        while True:
+            response = client.get(url, {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            texts.extend(
+                post.text for post in response.context['posts'])
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return texts
+
+    def test_scroll_returns_every_post_once(self):
+        """Порции карточек покрывают ленту без пропусков и повторов."""
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('text', flat=True))
+        for client, url in (
+            (self.guest_client, reverse('posts:index_more')),
+            (self.guest_client,
+             reverse('posts:group_list_more', args=(self.group.slug,))),
+            (self.guest_client,
+             reverse('posts:profile_more', args=(self.author.username,))),
+            (self.authorized_client, reverse('posts:follow_index_more')),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.scroll(client, url), expected)
+
+    def test_fragment_has_no_page_shell(self):
+        """В ответе только карточки, без base.html и пагинатора."""
+        response = self.guest_client.get(reverse('posts:index_more'))
+        self.assertTemplateUsed(response, 'posts/includes/cards.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertTemplateNotUsed(
+            response, 'posts/includes/paginator.html')
+
+    def test_fragment_is_cached_per_cursor(self):
+        """Повтор той же порции отдаётся из кеша без запросов к базе."""
+        url = reverse('posts:index_more')
+        cursor = self.guest_client.get(url)['X-Next-Cursor']
+        self.guest_client.get(url, {'cursor': cursor})
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url, {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+
+    def test_bad_cursor(self):
+        response = self.guest_client.get(
+            reverse('posts:index_more'), {'cursor': 'мусор'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_follow_fragment_requires_login(self):
+        response = self.guest_client.get(reverse('posts:follow_index_more'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_first_page_continues_by_cursor(self):
+        """Первая страница ленты отдаёт курсор, с которого идут порции."""
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('text', flat=True))
+        for page, more in (
+            (reverse('posts:index'), reverse('posts:index_more')),
+            (reverse('posts:group_list', args=(self.group.slug,)),
+             reverse('posts:group_list_more', args=(self.group.slug,))),
+            (reverse('posts:profile', args=(self.author.username,)),
+             reverse('posts:profile_more', args=(self.author.username,))),
+        ):
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                cursor = response['X-Next-Cursor']
+                self.assertContains(
+                    response, f'data-next-cursor="{cursor}"')
+                texts = [
+                    post.text for post in response.context['page_obj']]
+                self.assertEqual(
+                    texts + self.scroll(self.guest_client, more, cursor),
+                    expected)
+        response = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertNotIn('X-Next-Cursor', response)
+
+    @override_settings(STREAMING_RENDER=True)
+    def test_streamed_page_puts_cursor_after_cards(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', args=(self.author.username,)))
+        page = b''.join(response.streaming_content).decode()
+        self.assertIn('data-next-cursor="', page)
+        self.assertLess(
+            page.rindex('<hr>'), page.index('data-next-cursor="'))
+
+    def test_fragments_have_likes(self):
+        """Порции показывают лайки, а в ленте подписок — и свои отметки."""
+        post = Post.objects.order_by('-pub_date', '-id').first()
+        like(self.reader, post.pk)
+        response = self.guest_client.get(reverse('posts:index_more'))
+        self.assertEqual(response.context['posts'][0].like_count, 1)
+        response = self.authorized_client.get(
+            reverse('posts:follow_index_more'))
+        self.assertIs(response.context['posts'][0].liked, True)
@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post
+from ..polling import latest_key, raise_mark
+
+User = get_user_model()
+
+
+class NewPostsPollingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.author, text='Первый')
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def poll(self, client, url_name, after):
+        return client.get(reverse(url_name), {'after': after}).json()
+
+    def test_nothing_new_costs_no_queries(self):
+        """Без новых постов опрос общей ленты не ходит в базу."""
+        with self.assertNumQueries(0):
+            data = self.poll(self.guest_client, 'api:index_since',
+                             self.post.pk)
+        self.assertEqual(data, {'count': 0, 'ids': [],
+                                'latest': self.post.pk})
+
+    def test_new_posts_are_reported(self):
+        """Новые посты приходят в ответе числом и списком id."""
+        first = Post.objects.create(author=self.stranger, text='Второй')
+        second = Post.objects.create(author=self.author, text='Третий')
+        data = self.poll(self.guest_client, 'api:index_since', self.post.pk)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['ids'], [second.pk, first.pk])
+
+    def test_mark_is_restored_from_database(self):
+        """После очистки кеша метка читается из базы."""
+        cache.clear()
+        data = self.poll(self.guest_client, 'api:index_since', 0)
+        self.assertEqual(data['latest'], self.post.pk)
+
+    def test_follow_feed_counts_only_followed_authors(self):
+        Post.objects.create(author=self.stranger, text='Чужой')
+        data = self.poll(self.authorized_client, 'api:follow_since',
+                         self.post.pk)
+        self.assertEqual(data['count'], 0)
+        post = Post.objects.create(author=self.author, text='Свой')
+        data = self.poll(self.authorized_client, 'api:follow_since',
+                         self.post.pk)
+        self.assertEqual(data['ids'], [post.pk])
+
+    def test_idle_follow_poll_costs_no_queries(self):
+        """Опрос ленты подписок без новых постов не ходит в базу."""
+        self.poll(self.authorized_client, 'api:follow_since', self.post.pk)
+        with self.assertNumQueries(0):
+            data = self.poll(self.authorized_client, 'api:follow_since',
+                             self.post.pk)
+        self.assertEqual(data['count'], 0)
+
+    def test_mark_never_moves_back(self):
+        """Запись старого поста после нового не опускает метку."""
+        key = latest_key()
+        raise_mark(key, self.post.pk + 2)
+        raise_mark(key, self.post.pk + 1)
+        self.assertEqual(cache.get(key), self.post.pk + 2)
+
+    def test_busy_mark_is_dropped(self):
+        """Не дождавшись блокировки, процесс сбрасывает метку."""
+        key = latest_key()
+        raise_mark(key, self.post.pk)
+        cache.add(f'{key}:lock', 1)
+        with mock.patch('posts.polling.time.sleep'):
+            raise_mark(key, self.post.pk + 1)
+        self.assertIsNone(cache.get(key))
+        data = self.poll(self.guest_client, 'api:index_since', 0)
+        self.assertEqual(data['latest'], self.post.pk)
+
+    def test_bad_requests(self):
+        response = self.guest_client.get(reverse('api:index_since'))
+        self.assertEqual(response.status_code, 400)
+        response = self.guest_client.get(
+            reverse('api:follow_since'), {'after': 0})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def snapshot(prefix):
+    return (
+        list(Post.objects.filter(
+            author__username__startswith=f'{prefix}_'
+        ).order_by('id').values_list(
+            'text', 'author__username', 'group__slug', 'image')),
+        list(Follow.objects.filter(
+            user__username__startswith=f'{prefix}_'
+        ).order_by('id').values_list('user__username', 'author__username')),
+        Comment.objects.filter(
+            author__username__startswith=f'{prefix}_').count(),
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedDataTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, prefix, seed=7):
+        call_command(
+            'seed_data', seed=seed, prefix=prefix, users=30, groups=4,
+            posts=300, images=2, batch_size=50, stdout=StringIO())
+
+    def test_seed_creates_requested_volume(self):
+        """Команда создаёт заданное число строк каждого вида."""
+        self.seed('a')
+        self.assertEqual(
+            User.objects.filter(username__startswith='a_').count(), 30)
+        self.assertEqual(
+            Group.objects.filter(slug__startswith='a-').count(), 4)
+        self.assertEqual(
+            Post.objects.filter(author__username__startswith='a_').count(),
+            300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')).exists())
+
+    def test_seed_is_reproducible(self):
+        """Одинаковый seed даёт одинаковые данные."""
+        self.seed('a')
+        first = snapshot('a')
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed('a')
+        self.assertEqual(snapshot('a'), first)
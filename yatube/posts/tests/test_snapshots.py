@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..counters import view_counter
+from ..models import Comment, Group, Post
+from ..snapshots import snapshot_path, write_snapshot
+
+User = get_user_model()
+TEMP_SNAPSHOT_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(SNAPSHOT_ROOT=TEMP_SNAPSHOT_ROOT, SNAPSHOT_COLD_DAYS=30)
+class SnapshotTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SNAPSHOT_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.old_post = Post.objects.create(
+            text='Старый пост', author=self.author)
+        self.new_post = Post.objects.create(
+            text='Свежий пост', author=self.author)
+        Post.objects.filter(pk=self.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=60))
+        call_command('build_snapshots', clear=True, stdout=StringIO())
+
+    def test_only_cold_posts_are_snapshotted(self):
+        self.assertTrue(os.path.exists(snapshot_path(self.old_post.pk)))
+        self.assertFalse(os.path.exists(snapshot_path(self.new_post.pk)))
+
+    @override_settings(USE_SSI_FRAGMENTS=True)
+    def test_snapshot_is_anonymous_page(self):
+        """Копия совпадает со страницей поста для гостя за nginx."""
+        with open(snapshot_path(self.old_post.pk), 'rb') as file:
+            snapshot = file.read()
+        response = Client().get(
+            reverse('posts:post_detail', args=(self.old_post.pk,)))
+        self.assertEqual(snapshot, response.content)
+
+    def test_snapshot_does_not_count_views(self):
+        """Сборка копии не просмотр, а счётчик в копии — SSI-вставка."""
+        view_counter.flush()
+        write_snapshot(self.old_post.pk)
+        self.assertFalse(view_counter.pending)
+        with open(snapshot_path(self.old_post.pk), encoding='utf-8') as file:
+            snapshot = file.read()
+        url = reverse('core:fragment', args=('post_views',))
+        self.assertIn(
+            f'<!--# include virtual="{url}?post_id={self.old_post.pk}" -->',
+            snapshot)
+
+    def test_author_post_count_is_not_baked_in(self):
+        """Число постов автора в копии — SSI-вставка, а не цифра."""
+        with open(snapshot_path(self.old_post.pk), encoding='utf-8') as file:
+            snapshot = file.read()
+        url = reverse('core:fragment', args=('author_posts',))
+        self.assertIn(
+            f'<!--# include virtual="{url}?author_id={self.author.pk}" -->',
+            snapshot)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        response = Client().get(url, {'author_id': self.author.pk})
+        self.assertContains(response, '<span>3</span>')
+
+    def test_deleting_group_drops_snapshots(self):
+        """Копии постов удалённой группы не ссылаются на неё."""
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.filter(pk=self.old_post.pk).update(group=group)
+        write_snapshot(self.old_post.pk)
+        group.delete()
+        self.assertFalse(os.path.exists(snapshot_path(self.old_post.pk)))
+
+    def test_recently_commented_post_is_not_cold(self):
+        Comment.objects.create(
+            post=self.old_post, author=self.author, text='Комментарий')
+        self.assertFalse(os.path.exists(snapshot_path(self.old_post.pk)))
+        call_command('build_snapshots', stdout=StringIO())
+        self.assertFalse(os.path.exists(snapshot_path(self.old_post.pk)))
+
+    def test_edit_and_delete_drop_snapshot(self):
+        self.old_post.refresh_from_db()
+        self.old_post.text = 'Исправленный текст'
+        self.old_post.save()
+        self.assertFalse(os.path.exists(snapshot_path(self.old_post.pk)))
+        call_command('build_snapshots', stdout=StringIO())
+        with open(snapshot_path(self.old_post.pk), encoding='utf-8') as file:
+            self.assertIn('Исправленный текст', file.read())
+        post_id = self.old_post.pk
+        self.old_post.delete()
+        self.assertFalse(os.path.exists(snapshot_path(post_id)))
+
+    def test_renaming_group_and_users_drops_snapshots(self):
+        """Копия сбрасывается при смене названия группы и имён людей."""
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.filter(pk=self.old_post.pk).update(group=group)
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(
+            post=self.old_post, author=reader, text='Комментарий')
+        Post.objects.filter(pk=self.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=60))
+        path = snapshot_path(self.old_post.pk)
+        renames = (
+            (group, 'title', 'Новое название'),
+            (group, 'slug', 'new-slug'),
+            (User.objects.get(pk=self.author.pk), 'first_name', 'Автор'),
+            (reader, 'username', 'renamed_reader'),
+        )
+        for instance, field, value in renames:
+            with self.subTest(field=field):
+                write_snapshot(self.old_post.pk)
+                setattr(instance, field, value)
+                instance.save()
+                self.assertFalse(os.path.exists(path))
+
+    def test_login_keeps_snapshots(self):
+        """Сохранения без видимых полей копии не трогают."""
+        author = User.objects.get(pk=self.author.pk)
+        author.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            author.save(update_fields=['last_login'])
+        author.email = 'auth@example.com'
+        author.save()
+        self.assertTrue(os.path.exists(snapshot_path(self.old_post.pk)))
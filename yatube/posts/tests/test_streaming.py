@@ -0,0 +1,99 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..streaming import STREAM_MARKER
+
+User = get_user_model()
+
+
+def normalize(html):
+    """HTML без пробельных символов и без одноразовых CSRF-токенов."""
+    html = re.sub(r'name="csrfmiddlewaretoken" value="\w+"', '', html)
+    return ''.join(html.split())
+
+
+class StreamingRenderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Пост номер {number}', author=cls.author,
+                 group=cls.group)
+            for number in range(12)
+        ])
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(text=f'Комментарий {number}', author=cls.reader,
+                    post=cls.post)
+            for number in range(3)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def pages(self):
+        return (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+
+    def test_streamed_page_matches_regular_page(self):
+        """Потоковая страница содержит то же, что и обычная."""
+        for url in self.pages():
+            with self.subTest(url=url):
+                regular = self.client.get(url)
+                with override_settings(STREAMING_RENDER=True):
+                    streamed = self.client.get(url)
+                self.assertFalse(regular.streaming)
+                self.assertTrue(streamed.streaming)
+                content = b''.join(streamed.streaming_content).decode()
+                self.assertNotIn(STREAM_MARKER, content)
+                self.assertEqual(
+                    normalize(content), normalize(regular.content.decode()))
+
+    @override_settings(STREAMING_RENDER=True)
+    def test_head_is_sent_before_posts(self):
+        """Первый кусок ответа — шапка страницы без постов."""
+        response = self.client.get(reverse('posts:follow_index'))
+        head = next(iter(response.streaming_content)).decode()
+        self.assertIn('<head>', head)
+        self.assertIn('</header>', head)
+        self.assertNotIn('Пост номер', head)
+
+    @override_settings(STREAMING_RENDER=True, STREAM_CHUNK_SIZE=5)
+    def test_likes_are_fetched_per_chunk(self):
+        """Лайки второй пачки запрашиваются после отправки первой."""
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,)))
+        chunks = iter(response.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            next(chunks)
+            next(chunks)
+        first = [query['sql'] for query in queries.captured_queries]
+        with CaptureQueriesContext(connection) as queries:
+            rest = b''.join(chunks).decode()
+        self.assertEqual(rest.count('<article>'), 9)
+        self.assertEqual(
+            sum('posts_likecounter' in sql for sql in first), 1)
+        self.assertEqual(sum(
+            'posts_likecounter' in query['sql']
+            for query in queries.captured_queries), 1)
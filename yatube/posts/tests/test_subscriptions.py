@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.db.models import Q
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..following import follow_sources
+from ..models import Follow, Group, GroupSubscription, Post
+from ..pagination import merged_keyset_page
+
+User = get_user_model()
+
+
+class GroupSubscriptionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='auth')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        posts = []
+        for number in range(30):
+            posts.append(Post(
+                author=(cls.author, cls.stranger)[number % 2],
+                group=cls.group if number % 3 == 0 else None,
+                text=f'Пост номер {number}'))
+        Post.objects.bulk_create(posts)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupSubscription.objects.create(user=cls.reader, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def expected(self):
+        return list(Post.objects.filter(
+            Q(author=self.author) | Q(group=self.group)
+        ).order_by('-pub_date', '-id'))
+
+    def test_follow_feed_merges_authors_and_groups(self):
+        """Лента подписок — слияние авторов и групп без повторов."""
+        url = reverse('posts:follow_index')
+        posts, cursor = [], None
+        while True:
+            response = self.authorized_client.get(
+                url, {'cursor': cursor} if cursor else {})
+            self.assertIs(type(response.context['page_obj']), Page)
+            posts.extend(response.context['page_obj'])
+            cursor = response.context['cursor']
+            if not cursor:
+                break
+        self.assertEqual(posts, self.expected())
+
+    def test_page_cost_does_not_grow_with_sources(self):
+        """Число запросов страницы не зависит от числа постов источников."""
+        url = reverse('posts:follow_index')
+        self.authorized_client.get(url)
+        # Две ленты-источника, рекомендации авторов и лайки страницы.
+        with self.assertNumQueries(4):
+            self.authorized_client.get(url)
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Ещё {number}')
+            for number in range(50))
+        with self.assertNumQueries(4):
+            self.authorized_client.get(url)
+
+    @contextmanager
+    def count_steps(self):
+        """Шаги виртуальной машины SQLite: растут с числом прочитанных строк.
+        """
+        steps = [0]
+
+        def step():
+            steps[0] += 1
+
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(step, 100)
+        try:
+            yield steps
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+
+    def page_steps(self):
+        with self.count_steps() as steps:
+            merged_keyset_page(
+                Post.objects.cards(), follow_sources(self.reader.id), None,
+                10)
+        return steps[0]
+
+    @skipUnless(connection.vendor == 'sqlite', 'счёт шагов есть в SQLite')
+    def test_page_reads_do_not_grow_with_posts(self):
+        """Страница читает только головы лент источников.
+
+        Ни свежие чужие посты, ни старые посты источников не увеличивают
+        число прочитанных строк.
+        """
+        follow_sources(self.reader.id)
+        before = self.page_steps()
+        old = timezone.now() - timedelta(days=365)
+        Post.objects.bulk_create(
+            Post(author=self.stranger, text=f'Чужой {number}')
+            for number in range(3000))
+        archive = Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Архив {number}')
+            for number in range(3000))
+        Post.objects.filter(
+            pk__in=[post.pk for post in archive]).update(pub_date=old)
+        self.assertLess(self.page_steps(), before * 2)
+
+    def test_api_follow_feed_matches_page(self):
+        response = self.authorized_client.get(
+            reverse('api:follow_index'), {'limit': 100, 'fields': 'id'})
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [post.pk for post in self.expected()])
+
+    def test_subscribe_and_unsubscribe(self):
+        other = User.objects.create_user(username='other')
+        client = Client()
+        client.force_login(other)
+        subscribe = reverse('posts:group_subscribe', args=(self.group.slug,))
+        self.assertEqual(client.get(subscribe).status_code, 405)
+        for _ in range(2):
+            client.post(subscribe)
+        self.assertEqual(
+            GroupSubscription.objects.filter(user=other).count(), 1)
+        response = client.get(
+            reverse('posts:group_list', args=(self.group.slug,)))
+        self.assertTrue(response.context['subscribed'])
+        client.post(
+            reverse('posts:group_unsubscribe', args=(self.group.slug,)))
+        self.assertFalse(
+            GroupSubscription.objects.filter(user=other).exists())
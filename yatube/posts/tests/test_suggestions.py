@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, StaleSuggestions
+from ..suggestions import FollowGraph
+
+User = get_user_model()
+
+
+class FollowSuggestionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'hub', 'star', 'niche', 'new')
+        }
+        follows = (
+            ('reader', 'friend'), ('reader', 'hub'),
+            ('friend', 'star'), ('friend', 'niche'),
+            ('hub', 'star'), ('hub', 'friend'),
+            ('niche', 'star'),
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.users[user], author=cls.users[author])
+            for user, author in follows)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.users['reader'])
+
+    def build(self, **options):
+        call_command('build_suggestions', stdout=StringIO(), **options)
+
+    def suggested(self, name):
+        return list(FollowSuggestion.objects.filter(
+            user=self.users[name]).values_list('author__username', flat=True))
+
+    def test_friends_of_friends_ranked_by_paths(self):
+        """Автора, которого читают оба избранных, советуют первым."""
+        graph = FollowGraph()
+        authors = [
+            author for author, _ in graph.suggest(self.users['reader'].id, 2)]
+        self.assertEqual(
+            authors, [self.users['star'].id, self.users['niche'].id])
+
+    def test_user_without_follows_gets_popular_authors(self):
+        self.build(full=True)
+        self.assertEqual(self.suggested('new')[0], 'star')
+        self.assertNotIn('new', self.suggested('new'))
+
+    def test_follow_marks_user_stale_and_build_refreshes(self):
+        """Подписка отмечает пользователя, пересчёт снимает отметку."""
+        self.build(full=True)
+        self.assertFalse(StaleSuggestions.objects.exists())
+        Follow.objects.create(
+            user=self.users['new'], author=self.users['friend'])
+        self.assertTrue(StaleSuggestions.objects.filter(
+            user=self.users['new']).exists())
+        self.build()
+        self.assertFalse(StaleSuggestions.objects.exists())
+        self.assertEqual(self.suggested('new')[:2], ['star', 'niche'])
+
+    def test_pages_show_suggestions_without_followed(self):
+        self.build(full=True)
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['star'])
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=('friend',)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                usernames = [
+                    suggestion.author.username
+                    for suggestion in response.context['suggestions']]
+                self.assertIn('niche', usernames)
+                self.assertNotIn('star', usernames)
+                self.assertContains(response, 'Кого почитать')
+
+    def test_deleted_user_is_skipped(self):
+        """Удаление пользователя с подписками не ломает пересчёт."""
+        self.users['hub'].delete()
+        self.build()
+        self.assertFalse(StaleSuggestions.objects.exists())
+        self.assertEqual(self.suggested('reader'), ['star', 'niche'])
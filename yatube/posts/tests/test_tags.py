@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, Tag, TaggedPost
+from ..tags import parse_tags
+
+User = get_user_model()
+
+
+class HashtagTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def tags(self, post):
+        return set(TaggedPost.objects.filter(post=post).values_list(
+            'tag__name', flat=True))
+
+    def test_parse_tags(self):
+        self.assertEqual(
+            parse_tags('Про #Django и #питон, но не a#b и не &#39;'),
+            {'django', 'питон'})
+
+    def test_index_follows_create_edit_and_delete(self):
+        """Индекс меняется вместе с текстом поста и удаляется с ним."""
+        self.authorized_client.post(
+            reverse('posts:create_post'), {'text': 'Пишу #django #python'})
+        post = Post.objects.get()
+        self.assertEqual(self.tags(post), {'django', 'python'})
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Пишу #django #тесты'})
+        self.assertEqual(self.tags(post), {'django', 'тесты'})
+        post.delete()
+        self.assertFalse(TaggedPost.objects.exists())
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_tag_page_walks_by_cursor(self):
+        """Лента хештега листается курсором без пропусков."""
+        for number in range(13):
+            Post.objects.create(
+                author=self.author, text=f'Пост {number} #лента')
+        Post.objects.create(author=self.author, text='Без хештега')
+        url = reverse('posts:tag', args=('лента',))
+        response = self.guest_client.get(url)
+        texts = [post.text for post in response.context['posts']]
+        cursor = response.context['cursor']
+        response = self.guest_client.get(url, {'cursor': cursor})
+        texts += [post.text for post in response.context['posts']]
+        self.assertIsNone(response.context['cursor'])
+        expected = list(Post.objects.filter(
+            text__contains='#лента').order_by(
+            '-pub_date', '-id').values_list('text', flat=True))
+        self.assertEqual(texts, expected)
+        self.assertContains(
+            response, f'<a href="{url}">#лента</a>', html=False)
+
+    def test_rebuild_matches_incremental_index(self):
+        Post.objects.create(author=self.author, text='#один #два')
+        Post.objects.create(author=self.author, text='#два')
+        incremental = set(TaggedPost.objects.values_list(
+            'tag__name', 'post_id'))
+        call_command('rebuild_tags', stdout=StringIO())
+        self.assertEqual(
+            set(TaggedPost.objects.values_list('tag__name', 'post_id')),
+            incremental)
+
+    def test_unknown_tag(self):
+        response = self.guest_client.get(reverse('posts:tag', args=('нет',)))
+        self.assertEqual(response.status_code, 404)
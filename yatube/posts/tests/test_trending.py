@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, PostScore
+from ..trending import bump, event_score
+
+User = get_user_model()
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(
+                post=post, author=self.author, text='Комментарий')
+
+    def ranking(self):
+        return list(PostScore.objects.order_by(
+            '-score').values_list('post_id', flat=True))
+
+    def test_comments_raise_post(self):
+        """Пост с большим числом свежих комментариев выше в ленте."""
+        first, second, third = self.posts
+        self.comment(first, 1)
+        self.comment(second, 3)
+        self.assertEqual(self.ranking(), [second.pk, first.pk])
+        self.assertFalse(PostScore.objects.filter(post=third).exists())
+
+    def test_old_activity_decays(self):
+        """Одно свежее событие обгоняет два, случившихся сутки назад."""
+        old, fresh = self.posts[:2]
+        now = timezone.now()
+        bump(old.pk, 1, now - timedelta(hours=24))
+        bump(old.pk, 1, now - timedelta(hours=24))
+        bump(fresh.pk, 1, now)
+        self.assertEqual(self.ranking(), [fresh.pk, old.pk])
+
+    def test_score_is_log_of_decayed_sum(self):
+        now = timezone.now()
+        bump(self.posts[0].pk, 1, now)
+        bump(self.posts[0].pk, 1, now)
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=self.posts[0]).score,
+            event_score(now, 2))
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.comment(self.posts[0], 2)
+        self.comment(self.posts[1], 1)
+        incremental = dict(PostScore.objects.values_list('post_id', 'score'))
+        call_command('rebuild_trending', stdout=StringIO())
+        rebuilt = dict(PostScore.objects.values_list('post_id', 'score'))
+        self.assertEqual(set(rebuilt), set(incremental))
+        for post_id, score in rebuilt.items():
+            self.assertAlmostEqual(score, incremental[post_id])
+
+    def test_trending_page(self):
+        """Страница популярного: посты по рейтингу, без агрегатов по постам."""
+        self.comment(self.posts[0], 1)
+        self.comment(self.posts[2], 2)
+        client = Client()
+        # Число рейтингов, страница рейтингов с постами, лайки страницы.
+        with self.assertNumQueries(3):
+            response = client.get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.posts[2], self.posts[0]])
@@ -127,7 +127,7 @@ class ViewTest(TestCase):
     def test_follow_user_another(self):
         """Follow на другого пользователя работает корректно"""
         self.authorized_client.force_login(self.user_nonauth)
-        self.authorized_client.get(reverse(
+        self.authorized_client.post(reverse(
             'posts:profile_follow',
             kwargs={'username': self.user.username}))
         follow_exist = Follow.objects.filter(
@@ -137,7 +137,7 @@ class ViewTest(TestCase):
 
     def test_follow_on_author(self):
         """Follow на себя работает корректно"""
-        self.authorized_client.get(reverse(
+        self.authorized_client.post(reverse(
             'posts:profile_follow',
             kwargs={'username': self.user.username}))
         follow_exist = Follow.objects.filter(
@@ -152,7 +152,7 @@ class ViewTest(TestCase):
             user=self.user_nonauth,
             author=self.user,
         )
-        self.authorized_client.get(reverse(
+        self.authorized_client.post(reverse(
             'posts:profile_unfollow',
             kwargs={'username': self.user.username}))
         follow_exist = Follow.objects.filter(
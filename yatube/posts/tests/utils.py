@@ -0,0 +1,38 @@
+import json
+import os
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+def load_budgets():
+    with open(BUDGETS_PATH) as file:
+        return json.load(file)
+
+
+class QueryBudgetMixin:
+    """Проверка запроса к представлению на бюджет запросов и времени."""
+
+    budgets = load_budgets()
+
+    def assertWithinBudget(self, url_name, client, url, data=None,
+                           method='get'):
+        budget = self.budgets[url_name]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            elapsed = (time.perf_counter() - started) * 1000
+        self.assertLessEqual(
+            len(queries), budget['queries'],
+            f'{url_name} выполняет {len(queries)} SQL-запросов при бюджете '
+            f'{budget["queries"]}:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries))
+        if 'ms' in budget:
+            self.assertLessEqual(
+                elapsed, budget['ms'],
+                f'{url_name} отвечает {elapsed:.0f} мс при бюджете '
+                f'{budget["ms"]} мс')
+        return response
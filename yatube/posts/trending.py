@@ -0,0 +1,118 @@
+"""Лента популярного с затуханием по времени.
+
+Событие в момент t с весом w добавляет к рейтингу поста величину
+w * 2 ** (t / half_life). Рейтинг хранится в логарифмах, чтобы не
+переполниться: score = ln(сумма), а сложение — это logaddexp. Порядок
+постов по такой сумме тот же, что по сумме затухающих весов на любой
+момент, поэтому рейтинг не нужно пересчитывать со временем.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Comment, Post, PostScore, card_fields
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+COMMENT_WEIGHT = 1.0
+VIEW_WEIGHT = 0.1
+
+
+def event_score(moment, weight=1.0):
+    """Логарифм вклада события с весом weight в момент moment."""
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    age = (moment - EPOCH).total_seconds()
+    return math.log(weight) + age * math.log(2) / half_life
+
+
+def logaddexp(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def bump(post_id, weight, moment=None):
+    """Добавляет посту событие с весом weight.
+
+    Рейтинг меняется одним UPDATE с logaddexp на стороне базы, без
+    блокировки строки на время транзакции. Если строки ещё нет, она
+    вставляется с ON CONFLICT DO NOTHING: при гонке двух первых событий
+    одно из них теряется, для рейтинга это неважно.
+    """
+    value = Value(event_score(moment or timezone.now(), weight))
+    high = Greatest(F('score'), value)
+    low = Least(F('score'), value)
+    updated = PostScore.objects.filter(post_id=post_id).update(
+        score=high + Ln(1 + Exp(low - high)))
+    if not updated:
+        PostScore.objects.bulk_create(
+            [PostScore(post_id=post_id, score=value.value)],
+            ignore_conflicts=True)
+
+
+def bump_many(weights, moment=None):
+    """Добавляет события постам из weights ({id поста: вес}).
+
+    Все рейтинги меняются одним INSERT ... ON CONFLICT DO UPDATE с тем
+    же logaddexp, что и в bump. Соединение с таблицей постов пропускает
+    посты, удалённые, пока события копились.
+    """
+    if not weights:
+        return
+    moment = moment or timezone.now()
+    rows = sorted(
+        (post_id, event_score(moment, weight))
+        for post_id, weight in weights.items())
+    quote = connection.ops.quote_name
+    table = quote(PostScore._meta.db_table)
+    score = quote('score')
+    greatest, least = (
+        ('MAX', 'MIN') if connection.vendor == 'sqlite'
+        else ('GREATEST', 'LEAST'))
+    high = f'{greatest}({table}.{score}, EXCLUDED.{score})'
+    low = f'{least}({table}.{score}, EXCLUDED.{score})'
+    values = ', '.join(['(%s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        # WHERE нужен SQLite, чтобы не принять ON CONFLICT за часть JOIN.
+        cursor.execute(
+            f'INSERT INTO {table} ({quote("post_id")}, {score}) '
+            f'SELECT events.column1, events.column2 '
+            f'FROM (VALUES {values}) AS events '
+            f'JOIN {quote(Post._meta.db_table)} AS post '
+            f'ON post.{quote("id")} = events.column1 WHERE TRUE '
+            f'ON CONFLICT ({quote("post_id")}) DO UPDATE '
+            f'SET {score} = {high} + LN(1 + EXP({low} - {high}))',
+            [value for row in rows for value in row])
+
+
+def trending_posts():
+    """Рейтинги самых популярных постов, не больше TRENDING_SIZE."""
+    return PostScore.objects.select_related(
+        'post__author', 'post__group'
+    ).only('score', 'post', *card_fields('post')).order_by(
+        '-score', '-post_id')[:settings.TRENDING_SIZE]
+
+
+def rebuild_trending(now=None):
+    """Пересчитывает рейтинги по комментариям за TRENDING_WINDOW_DAYS."""
+    cutoff = (now or timezone.now()) - timedelta(
+        days=settings.TRENDING_WINDOW_DAYS)
+    scores = {}
+    for post_id, created in Comment.objects.filter(
+        created__gte=cutoff
+    ).values_list('post_id', 'created').iterator():
+        value = event_score(created, COMMENT_WEIGHT)
+        scores[post_id] = (
+            logaddexp(scores[post_id], value) if post_id in scores
+            else value)
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create((
+            PostScore(post_id=post_id, score=score)
+            for post_id, score in scores.items()
+        ), batch_size=1000)
+    return len(scores)
@@ -6,14 +6,30 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('more/', views.index_more, name='index_more'),
+    path('trending/', views.trending, name='trending'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/more/', views.profile_more,
+         name='profile_more'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('posts/<int:post_id>/unlike/', views.post_unlike,
+         name='post_unlike'),
+    path('tags/<str:name>/', views.tag_posts, name='tag'),
+    path('group/', views.groups, name='groups'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/subscribe/', views.group_subscribe,
+         name='group_subscribe'),
+    path('group/<slug:slug>/unsubscribe/', views.group_unsubscribe,
+         name='group_unsubscribe'),
+    path('group/<slug:slug>/more/', views.group_posts_more,
+         name='group_list_more'),
     path('create/', views.post_create, name='create_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/more/', views.follow_index_more, name='follow_index_more'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
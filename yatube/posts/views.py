@@ -1,12 +1,35 @@
+from functools import partial, wraps
+from itertools import islice
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
 from django.core.paginator import Paginator
+from django.db.models import F, QuerySet
+from django.http import (HttpResponseBadRequest, HttpResponseNotAllowed,
+                         JsonResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.http import is_safe_url
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_http_methods, require_POST
+
+from core.ratelimit import ratelimit
+from users.backends import user_cache
 
+from .caches import group_cache, post_cache
+from .counters import count_view
+from .following import follow, follow_sources, is_following, unfollow
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .likes import attach_likes, like, like_counts, unlike
+from .models import GroupStats, GroupSubscription, Post, Tag, card_fields
+from .pagination import (InvalidCursor, encode_cursor, keyset_page,
+                         merged_keyset_page)
+from .streaming import stream_render
+from .suggestions import suggestions_for
+from .trending import trending_posts
+
+# Заголовки, которыми браузеры помечают предзагрузку страниц.
+PREFETCH_HEADERS = ('HTTP_SEC_PURPOSE', 'HTTP_PURPOSE', 'HTTP_X_MOZ')
 
 
 def get_page(request, post_list):
@@ -14,26 +37,180 @@ def get_page(request, post_list):
     return paginator.get_page(request.GET.get('page'))
 
 
+def with_likes(posts, user):
+    """Посты с лайками пачками по STREAM_CHUNK_SIZE.
+
+    Посты читаются курсором, лайки запрашиваются на каждую пачку, так что
+    первая карточка ждёт только свою пачку, а не всю страницу.
+    """
+    if isinstance(posts, QuerySet):
+        posts = posts.iterator(settings.STREAM_CHUNK_SIZE)
+    posts = iter(posts)
+    chunk = list(islice(posts, settings.STREAM_CHUNK_SIZE))
+    while chunk:
+        yield from attach_likes(chunk, user)
+        chunk = list(islice(posts, settings.STREAM_CHUNK_SIZE))
+
+
+def next_cursor(page_obj, last):
+    """Курсор порции после первой страницы ленты или None.
+
+    Дальше первой страницы лента подгружается порциями из адресов .../more/
+    по курсору, который страница отдаёт после карточек и в X-Next-Cursor.
+    """
+    if last is None or page_obj.number != 1 or not page_obj.has_next():
+        return None
+    return encode_cursor(last.pub_date, last.pk)
+
+
+def last_post(page_obj):
+    return page_obj.object_list[-1] if page_obj.object_list else None
+
+
+def with_cursor(response, cursor):
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+    return response
+
+
+def render_feed(request, template_name, context):
+    """Страница ленты: целиком или потоком по карточкам постов.
+
+    Лентам с номерами страниц первая страница добавляет курсор
+    продолжения; лента подписок листается курсором и передаёт свой.
+    При потоковой отдаче последний пост известен только после карточек,
+    поэтому курсор приходит разметкой после них, без заголовка.
+    """
+    page_obj = context['page_obj']
+    if not settings.STREAMING_RENDER:
+        page_obj.object_list = attach_likes(page_obj.object_list, request.user)
+        if 'cursor' not in context:
+            context = dict(
+                context, cursor=next_cursor(page_obj, last_post(page_obj)))
+        return with_cursor(
+            render(request, template_name, context), context['cursor'])
+
+    def cursor_mark(last):
+        return render_to_string(
+            'posts/includes/cursor.html',
+            {'cursor': next_cursor(page_obj, last)})
+
+    return stream_render(
+        request, template_name, context,
+        with_likes(page_obj.object_list, request.user),
+        'posts/includes/posts.html', 'post', separator='<hr>',
+        footer=None if 'cursor' in context else cursor_mark)
+
+
+def tag_posts(request, name):
+    """Лента хештега: проход по индексу TaggedPost от курсора."""
+    tag = get_object_or_404(Tag, name=name.lower())
+    try:
+        rows, cursor = keyset_page(
+            tag.tagged_posts.select_related(
+                'post__author', 'post__group'
+            ).only('tag', 'pub_date', 'post', *card_fields('post')),
+            request.GET.get('cursor'), settings.POSTS_ON_PAGE)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор.')
+    return render(request, 'posts/tag.html', {
+        'tag': tag,
+        'posts': attach_likes([row.post for row in rows], request.user),
+        'cursor': cursor,
+    })
+
+
+def groups(request):
+    """Каталог групп со сводкой из GroupStats."""
+    stats = GroupStats.objects.select_related('group').order_by(
+        F('last_post_at').desc(nulls_last=True), 'group__title')
+    return render(request, 'posts/groups.html', {'stats_list': stats})
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    return render(request, 'posts/group_list.html', {
+    group = group_cache.get_or_404(slug=slug)
+    subscribed = request.user.is_authenticated and (
+        group.subscribers.filter(user=request.user).exists()
+    )
+    return render_feed(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': get_page(request, group.posts.select_related(
-            'author'),)
+        'page_obj': get_page(request, group.posts.cards()),
+        'subscribed': subscribed,
     })
 
 
+def render_more(request, post_list, group=None, paginate=keyset_page,
+                personal=False):
+    """Следующая порция карточек ленты для бесконечной прокрутки.
+
+    Отдаются только карточки постов без шапки и пагинатора, курсор
+    следующей порции приходит в заголовке X-Next-Cursor. Лайки
+    пользователя отмечаются только в personal-порциях: остальные
+    кешируются одни на всех.
+    """
+    try:
+        posts, cursor = paginate(
+            post_list, request.GET.get('cursor'), settings.POSTS_ON_PAGE)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор.')
+    response = render(request, 'posts/includes/cards.html', {
+        'posts': attach_likes(posts, request.user if personal else None),
+        'group': group,
+        'cursor': cursor,
+    })
+    return with_cursor(response, cursor)
+
+
+@cache_page(settings.FEED_MORE_CACHE_TIMEOUT, key_prefix='feed_more')
+def index_more(request):
+    return render_more(request, Post.objects.cards())
+
+
+@cache_page(settings.FEED_MORE_CACHE_TIMEOUT, key_prefix='feed_more')
+def group_posts_more(request, slug):
+    group = group_cache.get_or_404(slug=slug)
+    return render_more(
+        request, group.posts.cards(), group=group)
+
+
+@cache_page(settings.FEED_MORE_CACHE_TIMEOUT, key_prefix='feed_more')
+def profile_more(request, username):
+    author = user_cache.get_or_404(username=username)
+    return render_more(request, author.posts.cards())
+
+
+@login_required
+def follow_index_more(request):
+    return render_more(
+        request, follow_sources(request.user.id),
+        paginate=partial(merged_keyset_page, Post.objects.cards()),
+        personal=True)
+
+
 @cache_page(20, key_prefix='index_page')
 def index(request):
+    page_obj = get_page(request, Post.objects.cards())
+    # Страница кешируется, поэтому лайки на ней без отметок пользователя.
+    page_obj.object_list = attach_likes(page_obj.object_list)
+    cursor = next_cursor(page_obj, last_post(page_obj))
     context = {
-        'page_obj': get_page(request, Post.objects.select_related(
-            'author', 'group')),
+        'page_obj': page_obj,
         'title': 'Последние обновления на сайте',
+        'cursor': cursor,
     }
-    return render(request, 'posts/index.html', context)
+    return with_cursor(render(request, 'posts/index.html', context), cursor)
+
+
+def trending(request):
+    """Популярные посты по затухающему рейтингу из PostScore."""
+    page_obj = get_page(request, trending_posts())
+    page_obj.object_list = attach_likes(
+        [score.post for score in page_obj], request.user)
+    return render(request, 'posts/trending.html', {'page_obj': page_obj})
 
 
 @login_required
+@ratelimit('post')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -52,8 +229,8 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    post = post_cache.get_or_404(pk=post_id)
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -75,36 +252,53 @@ def post_edit(request, post_id):
 
 def profile(request, username):
     """Профиль автора с возможность подписки на него."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
+    author = user_cache.get_or_404(username=username)
+    post_list = author.posts.cards()
     page_obj = get_page(request, post_list)
-    following = request.user.is_authenticated and (
-        author.following.filter(user=request.user).exists()
-    )
+    following = is_following(request.user, author.id)
     context = {
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'suggestions': suggestions_for(
+            request.user, settings.FOLLOW_SUGGESTIONS),
     }
-    return render(request, 'posts/profile.html', context)
+    return render_feed(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
     """Детальные сведения поста и комментарии к нему."""
-    post = get_object_or_404(Post.objects.select_related(
-        'author', 'group'), pk=post_id)
+    post = post_cache.get_or_404(pk=post_id)
+    views = None
+    if not settings.USE_SSI_FRAGMENTS:
+        # Со SSI просмотр засчитывает фрагмент post_views: nginx
+        # запрашивает его и для страниц, отданных из снапшотов.
+        views = count_view(post.pk)
+    return post_page(request, post, views=views)
+
+
+def post_page(request, post, **extra):
+    """Страница поста без учёта просмотра; её же сохраняют снапшоты."""
     comments = post.comments.select_related('author')
     context = {
         'post': post,
         'form': CommentForm(),
         'comments': comments,
+        # Считается, только если фрагмент рендерится на месте, а не SSI.
+        'author_posts': post.author.posts.count,
+        **extra,
     }
+    if settings.STREAMING_RENDER:
+        return stream_render(
+            request, 'posts/post_detail.html', context, comments.iterator(),
+            'posts/includes/comment.html', 'comment')
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@ratelimit('comment')
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = post_cache.get_or_404(pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -116,27 +310,113 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
+    """Посты избранных авторов и групп, слитые из отдельных лент.
+
+    Страница листается курсором, а не номером: так её стоимость не
+    зависит от того, сколько всего постов у источников подписки.
+    """
+    try:
+        posts, cursor = merged_keyset_page(
+            Post.objects.cards(), follow_sources(request.user.id),
+            request.GET.get('cursor'), settings.POSTS_ON_PAGE)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор.')
     context = {
-        'page_obj': get_page(
-            request,
-            Post.objects.filter(author__following__user=request.user)),
+        'page_obj': Paginator(posts, settings.POSTS_ON_PAGE).page(1),
+        'cursor': cursor,
+        'suggestions': suggestions_for(
+            request.user, settings.FOLLOW_SUGGESTIONS),
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(request, 'posts/follow.html', context)
+
+
+def refuse_prefetch(view):
+    """Не даёт браузерной предзагрузке ссылок выполнить подписку.
+
+    Кнопки отправляют POST; GET оставлен для старых ссылок, но запрос,
+    помеченный браузером как предзагрузка, получает 405.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        purpose = ' '.join(
+            request.META.get(header, '') for header in PREFETCH_HEADERS)
+        if request.method != 'POST' and 'prefetch' in purpose.lower():
+            return HttpResponseNotAllowed(['POST'])
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def follow_response(request, username, author_id, following):
+    if author_id is None:
+        user_cache.get_or_404(username=username)
+    if request.is_ajax():
+        return JsonResponse({'following': following})
+    return redirect('posts:profile', username)
 
 
 @login_required
+@require_http_methods(['GET', 'POST'])
+@refuse_prefetch
+@ratelimit('follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user != author:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author,
-        )
-    return redirect('posts:profile', username)
+    author_id = follow(request.user.id, username)
+    return follow_response(
+        request, username, author_id, username != request.user.username)
 
 
 @login_required
+@require_http_methods(['GET', 'POST'])
+@refuse_prefetch
+@ratelimit('follow', methods=('GET', 'POST'))
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
-    return redirect('posts:profile', username)
+    author_id = unfollow(request.user.id, username)
+    return follow_response(request, username, author_id, False)
+
+
+def like_response(request, post_id, liked):
+    if request.is_ajax():
+        return JsonResponse({
+            'liked': liked,
+            'likes': like_counts([post_id]).get(post_id, 0),
+        })
+    next_url = request.META.get('HTTP_REFERER')
+    if next_url and is_safe_url(
+            next_url, allowed_hosts={request.get_host()},
+            require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+@ratelimit('like')
+def post_like(request, post_id):
+    post = post_cache.get_or_404(pk=post_id)
+    like(request.user, post.pk)
+    return like_response(request, post.pk, True)
+
+
+@login_required
+@require_POST
+@ratelimit('like')
+def post_unlike(request, post_id):
+    unlike(request.user, post_id)
+    return like_response(request, post_id, False)
+
+
+@login_required
+@require_POST
+@ratelimit('follow')
+def group_subscribe(request, slug):
+    group = group_cache.get_or_404(slug=slug)
+    GroupSubscription.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+@ratelimit('follow')
+def group_unsubscribe(request, slug):
+    GroupSubscription.objects.filter(
+        user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug)
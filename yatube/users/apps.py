@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # Кеш пользователей подключает свои сигналы при импорте.
+        from . import backends  # noqa: F401
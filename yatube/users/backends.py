@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.objectcache import ObjectCache
+
+User = get_user_model()
+
+user_cache = ObjectCache(
+    User.objects.all(), fields=('pk', 'username'),
+    timeout=settings.USER_CACHE_TIMEOUT)
+
+
+def user_cache_key(user_id):
+    return user_cache.key('pk', user_id)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша."""
+
+    def get_user(self, user_id):
+        try:
+            user = user_cache.get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..backends import user_cache_key
+
+User = get_user_model()
+
+
+class CachedSessionUserTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_logged_in_page_needs_no_queries(self):
+        """Сессия и пользователь берутся из кеша без запросов к базе."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_session_survives_cache_loss(self):
+        """При пустом кеше сессия и пользователь читаются из базы."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(len(queries), 2)
+
+    def test_user_change_invalidates_cache(self):
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое имя'
+        user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+
+    def test_inactive_user_is_logged_out(self):
+        self.authorized_client.get(reverse('about:author'))
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        response = self.authorized_client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
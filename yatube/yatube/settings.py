@@ -24,8 +24,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = '_t%!%ftrk##3c5xqpzz@s@%97fiv=_m0u@-nbsm^$#@*pcs6*h'
 
+# Профиль настроек: development (по умолчанию) или production.
+SETTINGS_PROFILE = os.getenv('YATUBE_PROFILE', 'development')
+PRODUCTION = SETTINGS_PROFILE == 'production'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
 ALLOWED_HOSTS = [
     '*',
@@ -81,6 +85,19 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # Шаблоны компилируются один раз на процесс, а отладочный
+    # context processor не нужен.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove(
+        'django.template.context_processors.debug')
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -101,7 +118,10 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Держим соединение между запросами вместо нового на каждый запрос.
+        'CONN_MAX_AGE': int(
+            os.getenv('DB_CONN_MAX_AGE', 60 if PRODUCTION else 0)),
     }
 }
 
@@ -145,9 +165,64 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Статические копии страниц старых постов, их отдаёт nginx.
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshots')
+SNAPSHOT_COLD_DAYS = 30
 
 # Константы
 POSTS_ON_PAGE = 10
+# Карточка поста в ленте показывает анонс не длиннее стольких символов.
+POST_EXCERPT_LENGTH = 300
+API_MAX_PAGE_SIZE = 100
+# Лимиты частоты запросов: (запросов, за сколько секунд) на пользователя
+# и на IP. Подряд проходит не больше limit запросов, дальше — по одному
+# за period / limit секунд (GCRA).
+RATELIMITS = {
+    'post': {'user': (10, 600), 'ip': (30, 600)},
+    'comment': {'user': (20, 300), 'ip': (60, 300)},
+    'follow': {'user': (30, 300), 'ip': (100, 300)},
+    'like': {'user': (60, 300), 'ip': (200, 300)},
+    'login': {'ip': (10, 300)},
+    'signup': {'ip': (10, 3600)},
+}
+# Адреса и сети прокси, от которых принимается заголовок X-Real-IP.
+# По умолчанию — локальный адрес и сети, которые docker выдаёт
+# контейнерам.
+TRUSTED_PROXIES = [
+    network.strip() for network in os.getenv(
+        'TRUSTED_PROXIES', '127.0.0.1,172.16.0.0/12').split(',')
+    if network.strip()
+]
+# Лента популярного: вес события вдвое меньше через каждые
+# TRENDING_HALF_LIFE_HOURS часов, в ленте не больше TRENDING_SIZE постов.
+TRENDING_HALF_LIFE_HOURS = 12
+TRENDING_SIZE = 100
+TRENDING_WINDOW_DAYS = 7
+# Просмотры постов копятся в памяти воркера и пишутся в базу не чаще
+# раза в VIEW_FLUSH_INTERVAL секунд или при VIEW_FLUSH_SIZE постах в буфере.
+VIEW_FLUSH_INTERVAL = 30
+VIEW_FLUSH_SIZE = 1000
+# Лайк поста прибавляется к одной из LIKE_COUNTER_SHARDS строк счётчика;
+# фильтр лайков пользователя живёт в кеше LIKE_FILTER_TIMEOUT секунд.
+LIKE_COUNTER_SHARDS = 8
+LIKE_FILTER_TIMEOUT = 24 * 3600
+# Сколько секунд кеш хранит id авторов, на которых подписан пользователь.
+FOLLOWING_CACHE_TIMEOUT = 24 * 3600
+# Сколько авторов рекомендовать в блоке «Кого почитать»
+# (рекомендации считает manage.py build_suggestions).
+FOLLOW_SUGGESTIONS = 5
+# Пост отклоняется, если у него уже есть DUPLICATE_POST_LIMIT копий
+# со сходством текста не ниже DUPLICATE_POST_SIMILARITY (по MinHash).
+DUPLICATE_POST_SIMILARITY = 0.8
+DUPLICATE_POST_LIMIT = 3
+# Сколько секунд кешируются порции карточек для бесконечной прокрутки.
+FEED_MORE_CACHE_TIMEOUT = 60
+
+# Ленты и страница поста отдаются потоком: шапка сразу, карточки по мере
+# чтения из базы.
+STREAMING_RENDER = os.getenv('STREAMING_RENDER', '0') == '1'
+# Карточки потоковой ленты читаются и получают лайки пачками такого размера.
+STREAM_CHUNK_SIZE = 5
 
 # login
 LOGIN_URL = 'users:login'
@@ -166,3 +241,25 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+if PRODUCTION:
+    # Общий для всех воркеров gunicorn кеш вместо кеша в памяти процесса.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.getenv('MEMCACHED_LOCATION', 'memcached:11211'),
+            'KEY_PREFIX': 'yatube',
+        }
+    }
+
+# Персональные фрагменты страниц подставляет nginx через SSI.
+USE_SSI_FRAGMENTS = PRODUCTION
+
+# Сессия и пользователь читаются из кеша, в базу идём только при промахе.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 60 * 60
+# Посты, группы и пользователи по ключу из адреса (core.objectcache);
+# отсутствие ключа помнится OBJECT_CACHE_MISS_TIMEOUT секунд.
+OBJECT_CACHE_TIMEOUT = 5 * 60
+OBJECT_CACHE_MISS_TIMEOUT = 60